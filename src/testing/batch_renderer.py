@@ -0,0 +1,198 @@
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from composer import iter_plans, render_song, OUTPUT_DIR
+from utils import instrumentation
+from utils.music_theory import MusicTheory
+from utils.section_cache import SectionCache
+from utils.render_cache import RenderCache
+
+def iter_seed_range(spec):
+    """Seed strings for '1000-50000' or '1,5,10-20' (ranges are inclusive), generated lazily."""
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+            if end < start:
+                raise ValueError(f"Invalid seed range: {part}")
+            yield from (str(s) for s in range(start, end + 1))
+        else:
+            yield str(int(part))
+
+def parse_seed_range(spec):
+    """Parse '1000-50000' or '1,5,10-20' into a list of seed strings (ranges are inclusive)."""
+    return list(iter_seed_range(spec))
+
+_section_cache = None
+_render_cache = None
+_trace_buffer = None
+
+def _init_worker(cache_options=None, metrics=False, trace=False):
+    # composer (generators, templates) is imported once per worker process;
+    # per-track progress output is silenced so only the batch summary is printed.
+    global _section_cache, _render_cache, _trace_buffer
+    sys.stdout = open(os.devnull, 'w')
+    MusicTheory.build_tables()
+    _section_cache = SectionCache()
+    if cache_options:
+        _render_cache = RenderCache(**cache_options)
+    # Metrics and hooks a forked worker inherits belong to the parent: each
+    # job's metrics and span events go back with its result instead.
+    instrumentation.clear_hooks()
+    instrumentation.reset()
+    if metrics:
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+    if trace:
+        _trace_buffer = instrumentation.EventBuffer()
+        instrumentation.add_hook(_trace_buffer)
+
+def _instrument_args():
+    """initargs for _init_worker's instrumentation, mirroring the parent's."""
+    return instrumentation.is_enabled(), instrumentation.is_enabled() and instrumentation.has_hooks()
+
+def _job_metrics():
+    """This worker's metrics since the last job (None when disabled), for instrumentation.merge()."""
+    if not instrumentation.is_enabled():
+        return None
+    data = instrumentation.drain()
+    if _trace_buffer is not None:
+        data["events"] = _trace_buffer.drain()
+    return data
+
+def _merge_metrics(data):
+    if data is not None:
+        instrumentation.merge(data)
+
+def _render_one(args):
+    seed, output_dir, repeat_sections = args
+    try:
+        output_file, song_info = render_song(seed, output_dir, section_cache=_section_cache,
+                                             repeat_sections=repeat_sections, render_cache=_render_cache)
+        return dict(song_info, file=os.path.basename(output_file))
+    except Exception as e:
+        return {"seed": seed, "error": str(e)}
+
+def _render_job(args):
+    return _render_one(args), _job_metrics()
+
+def _plan_chunk(args):
+    seeds, constraints, repeat_sections = args
+    return len(seeds), [plan.to_json() for plan in iter_plans(seeds, constraints, repeat_sections)]
+
+def _plan_job(args):
+    return _plan_chunk(args), _job_metrics()
+
+def plan_batch(seeds, out, constraints=None, workers=None, repeat_sections=(), chunk_size=20000):
+    """
+    Write the SongPlan of every seed matching `constraints` to `out` as JSON
+    lines, in seed order, without rendering anything. `seeds` may be any
+    iterable (e.g. iter_seed_range()), so huge ranges are never held in
+    memory. Returns the number of plans written.
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = iter(seeds)
+    chunks = iter(lambda: list(islice(seeds, chunk_size)), [])
+    # A single chunk (e.g. one --seed) is planned in-process rather than starting a pool
+    first = list(islice(chunks, 2))
+    if len(first) < 2:
+        workers = 1
+    jobs = ((chunk, constraints, tuple(repeat_sections)) for chunk in chain(first, chunks))
+
+    planned = matched = 0
+    started = time.perf_counter()
+
+    def write(result):
+        nonlocal planned, matched
+        count, lines = result
+        planned += count
+        matched += len(lines)
+        for line in lines:
+            out.write(line + "\n")
+
+    if workers == 1:
+        for job in jobs:
+            write(_plan_chunk(job))
+    else:
+        # Bounded submission keeps only a few chunks in flight, in seed order
+        def collect(future):
+            result, metrics = future.result()
+            _merge_metrics(metrics)
+            write(result)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(None,) + _instrument_args()) as pool:
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.submit(_plan_job, job))
+                if len(pending) >= workers * 2:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+
+    elapsed = time.perf_counter() - started
+    rate = planned / elapsed * 60 if elapsed else 0.0
+    print(f"[PLAN] Planned {planned} seeds, {matched} matched in {elapsed:.2f}s ({rate:,.0f} plans/min, {workers} workers)",
+          file=sys.stderr)
+    return matched
+
+def report_audio(results):
+    """Print failures and a summary for AudioRenderPool results; returns the number rendered."""
+    done = failed = 0
+    for result in results:
+        if "error" in result:
+            failed += 1
+            print(f"[AUDIO] {os.path.basename(result['midi'])} failed: {result['error']}")
+        else:
+            done += 1
+    print(f"[AUDIO] Rendered {done} WAV files ({failed} failed)")
+    return done
+
+def render_batch(seeds, workers=None, output_dir=OUTPUT_DIR, manifest_name="manifest.jsonl", repeat_sections=(),
+                 cache_options=None, audio_pool=None):
+    """
+    Render many seeds across a process pool.
+    Each file is produced by the same render_song() call as a single-seed run,
+    so outputs are byte-identical. A JSON-lines manifest (one line per seed,
+    in seed order) is written next to the MIDI files. `cache_options` are
+    RenderCache arguments (cache_dir, max_bytes, max_age) shared by all workers.
+    With an AudioRenderPool, each MIDI file is queued for WAV rendering as
+    soon as it is written, so audio renders overlap composition.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+    manifest_path = os.path.join(output_dir, manifest_name)
+
+    chunksize = max(1, len(seeds) // (workers * 8))
+    rendered = failed = 0
+    audio_jobs = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_options,) + _instrument_args()) as pool, \
+            open(manifest_path, 'w') as manifest:
+        jobs = ((seed, output_dir, tuple(repeat_sections)) for seed in seeds)
+        for entry, metrics in pool.map(_render_job, jobs, chunksize=chunksize):
+            _merge_metrics(metrics)
+            manifest.write(json.dumps(entry) + "\n")
+            if "error" in entry:
+                failed += 1
+                print(f"[BATCH] Seed {entry['seed']} failed: {entry['error']}")
+            else:
+                rendered += 1
+                if audio_pool is not None:
+                    audio_jobs.append(audio_pool.submit(os.path.join(output_dir, entry["file"])))
+
+    print(f"[BATCH] Rendered {rendered}/{len(seeds)} tracks with {workers} workers ({failed} failed)")
+    print(f"[BATCH] Manifest: {manifest_path}")
+    if audio_pool is not None:
+        report_audio(job.result() for job in audio_jobs)
+    return manifest_path
@@ -0,0 +1,276 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+# Modules that must not be imported just to compose and write MIDI
+HEAVY_MODULES = ["music21"]
+
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+import composer
+imported = time.perf_counter() - start
+composer.render_song("1", {output_dir!r})
+rendered = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{imported}}|{{rendered}}|{{','.join(heavy)}}")
+"""
+
+def _run_python(code):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=PROJECT_ROOT)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return elapsed, result.stdout.strip().splitlines()[-1]
+
+def bench_startup(runs=5, max_startup=None):
+    """
+    Time a cold interpreter importing the composer and rendering one track.
+    Fails if a heavy module (music21) is pulled in on the render path or if
+    the median cold start exceeds `max_startup` seconds.
+    """
+    process_times, import_times, render_times = [], [], []
+    heavy_loaded = set()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        code = STARTUP_PROBE.format(base_dir=BASE_DIR, output_dir=output_dir, heavy=HEAVY_MODULES)
+        for _ in range(runs):
+            elapsed, line = _run_python(code)
+            imported, rendered, heavy = line.split("|")
+            process_times.append(elapsed)
+            import_times.append(float(imported))
+            render_times.append(float(rendered))
+            heavy_loaded.update(m for m in heavy.split(",") if m)
+
+    results = {
+        "runs": runs,
+        "process_median_s": statistics.median(process_times),
+        "import_median_s": statistics.median(import_times),
+        "import_and_render_median_s": statistics.median(render_times),
+        "heavy_modules_loaded": sorted(heavy_loaded),
+    }
+
+    print(f"[BENCH] Cold start (median of {runs}): process {results['process_median_s']:.3f}s, "
+          f"import {results['import_median_s'] * 1000:.1f}ms, "
+          f"import+render {results['import_and_render_median_s'] * 1000:.1f}ms")
+
+    ok = True
+    if heavy_loaded:
+        print(f"[BENCH] FAIL: render path imported {', '.join(sorted(heavy_loaded))}")
+        ok = False
+    if max_startup is not None and results["process_median_s"] > max_startup:
+        print(f"[BENCH] FAIL: cold start {results['process_median_s']:.3f}s exceeds {max_startup:.3f}s")
+        ok = False
+    return results, ok
+
+# Fixed workload: every structure variation in both moods, with these seeds
+BENCH_SEEDS = ["1", "2", "3"]
+BENCH_MOODS = ["chill", "energetic"]
+# Small allocations vary between runs; memory growth below this is ignored
+PEAK_SLACK_KIB = 32
+
+def _measure(fn, repeat, number):
+    """Median and best seconds per call over `repeat` rounds of `number` calls, plus peak traced KiB."""
+    fn()  # warm up memo tables and imports
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(rounds),
+        "min_s": min(rounds),
+        "calls": number,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def bench_stages(repeat=5):
+    """
+    Time each generation stage on a fixed workload and record peak memory.
+    Returns {stage: {"median_s", "min_s", "calls", "peak_kib"}}; end-to-end
+    throughput is reported as tracks_per_s.
+    """
+    sys.path.insert(0, BASE_DIR)
+    sys.path.insert(0, PROJECT_ROOT)
+    import composer
+    from composer import (MusicTheory, BassGenerator, DrumGenerator, InstrumentManager, StructureManager,
+                          assemble_song, generate_sections, iter_plans, prepare_song, write_song_midi)
+    from utils.drum_fill import DrumFill
+    from utils.melody import MelodyEngine
+    from utils.rng import SeedStream
+
+    stages = {}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        structures = list(composer.load_structures() or {"standard": []})
+        songs = [prepare_song(seed, structure=name, mood=mood)
+                 for seed in BENCH_SEEDS for name in structures for mood in BENCH_MOODS]
+        generated = [generate_sections(info, sections) for info, sections in songs]
+        assembled = [assemble_song(sections, lanes) for (_, sections), lanes in zip(songs, generated)]
+
+        # Theory lookups over every progression chord and key used by the workload
+        lookups = [(chord, info["key"], info["scale"] == "minor")
+                   for info, sections in songs for _, prog, _, _ in sections for chord in prog]
+        note_names = [(name, octave) for name in MusicTheory.NOTES_SHARP for octave in range(1, 7)]
+
+        def theory():
+            for chord, key, minor in lookups:
+                MusicTheory.parse_roman_numeral(chord, key, minor)
+            for name, octave in note_names:
+                MusicTheory.note_to_midi(name, octave)
+        stages["theory_lookups"] = _measure(theory, repeat, 20)
+
+        plan_seeds = [str(seed) for seed in range(1000)]
+
+        def plans():
+            for _ in iter_plans(plan_seeds):
+                pass
+        stages["plan"] = _measure(plans, repeat, 3)
+
+        section_types = sorted({s[0] for _, sections in songs for s in sections})
+        for section_type in section_types:
+            work = [(info, s) for info, sections in songs for s in sections if s[0] == section_type]
+
+            def sections_of_type(work=work):
+                for info, (kind, prog, rng, last) in work:
+                    StructureManager.create_section(kind, prog, info["key"], info["scale"], MusicTheory,
+                                                    BassGenerator, DrumGenerator, InstrumentManager,
+                                                    info["mood"], last, SeedStream(rng.root_seed, *rng.path))
+            stages[f"create_section.{section_type}"] = _measure(sections_of_type, repeat, 3)
+
+        roots = [MusicTheory.parse_roman_numeral(chord, key, minor)[0] for chord, key, minor in lookups]
+
+        def bass():
+            rng = SeedStream("bench", "bass")
+            for index, root in enumerate(roots):
+                BassGenerator.generate_bass_part(root, is_chorus=index % 2 == 0, rng=rng)
+        stages["bass"] = _measure(bass, repeat, 10)
+
+        melodies = [([MusicTheory.parse_roman_numeral(chord, info["key"], info["scale"] == "minor") for chord in prog],
+                      info["key"], info["scale"], kind, info["mood"])
+                    for info, sections in songs for kind, prog, _, _ in sections]
+
+        def melody():
+            rng = SeedStream("bench", "melody")
+            for chords, key, scale, kind, mood in melodies:
+                MelodyEngine.generate_section(chords, key, scale, kind, mood, rng)
+        stages["melody"] = _measure(melody, repeat, 10)
+
+        def drums():
+            rng = SeedStream("bench", "drum")
+            for _ in range(200):
+                DrumGenerator.generate_standard_beat(rng)
+                DrumGenerator.generate_fill(rng)
+                DrumGenerator.generate_final_hit(rng)
+        stages["drum"] = _measure(drums, repeat, 10)
+
+        def drum_fills():
+            rng = SeedStream("bench", "drum_fill")
+            for _ in range(200):
+                DrumFill.generate_standard_beat(rng)
+                DrumFill.generate_transition_fill(rng)
+                DrumFill.generate_final_hit(rng)
+        stages["drum_fill"] = _measure(drum_fills, repeat, 10)
+
+        def assembly():
+            for (_, sections), lanes in zip(songs, generated):
+                assemble_song(sections, lanes)
+        stages["stream_assembly"] = _measure(assembly, repeat, 10)
+
+        def midi_write():
+            for (info, _), parts in zip(songs, assembled):
+                write_song_midi(parts, info, io.BytesIO())
+        stages["midi_write"] = _measure(midi_write, repeat, 10)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            seeds = [str(seed) for seed in range(1000, 1000 + len(songs))]
+
+            def end_to_end():
+                for seed in seeds:
+                    composer.render_song(seed, output_dir)
+            stages["end_to_end"] = _measure(end_to_end, repeat, 1)
+            stages["end_to_end"]["tracks_per_s"] = round(len(seeds) / stages["end_to_end"]["median_s"], 1)
+
+    for name, result in stages.items():
+        extra = f", {result['tracks_per_s']} tracks/s" if "tracks_per_s" in result else ""
+        print(f"[BENCH] {name:<28} {result['median_s'] * 1000:9.3f}ms  peak {result['peak_kib']:8.1f}KiB{extra}")
+    return stages
+
+def save_baseline(stages, path):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": stages,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f"[BENCH] Baseline saved: {path}")
+
+def compare_baseline(stages, path, tolerance=0.25):
+    """Fail stages whose median time or peak memory grew more than `tolerance` over the baseline."""
+    with open(path, 'r') as f:
+        baseline = json.load(f)["stages"]
+
+    ok = True
+    for name, result in stages.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, slack in (("median_s", 0.0), ("peak_kib", PEAK_SLACK_KIB)):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance) + slack:
+                print(f"[BENCH] REGRESSION: {name} {metric} {result[metric]:.6g} vs baseline {base[metric]:.6g}")
+                ok = False
+    if ok:
+        print(f"[BENCH] No regressions beyond {tolerance:.0%} of {path}")
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    startup = sub.add_parser("startup", help="Cold-start time of the composer")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--max-startup", type=float, default=None, help="Fail if median cold start exceeds this (seconds)")
+
+    stages = sub.add_parser("stages", help="Per-stage timings and peak memory")
+    stages.add_argument("--repeat", type=int, default=5)
+    stages.add_argument("--save", type=str, default=None, help="Write results as a JSON baseline")
+    stages.add_argument("--compare", type=str, default=None, help="Fail on regressions against a JSON baseline")
+    stages.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown/growth over the baseline")
+
+    args = parser.parse_args()
+
+    if args.command == "startup":
+        _, ok = bench_startup(args.runs, args.max_startup)
+        sys.exit(0 if ok else 1)
+
+    if args.command == "stages":
+        results = bench_stages(args.repeat)
+        ok = True
+        if args.compare:
+            ok = compare_baseline(results, args.compare, args.tolerance)
+        if args.save:
+            save_baseline(results, args.save)
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,384 @@
+import io
+import json
+import sys
+import os
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BASE_DIR)
+
+from utils.music_theory import MusicTheory
+from utils.instrument_manager import InstrumentManager
+from utils.template_registry import get_registry
+from utils.events import EventPart, LANE_CHANNELS
+from utils.instrumentation import count, span
+from utils.midi_writer import MidiTrack, write_midi
+from utils.progression_model import ProgressionModel
+from utils.rng import SeedStream
+from utils.song_plan import SongPlan
+from utils.transpose import key_offset, transpose_parts
+from utils.render_cache import RenderCache, fingerprint_files
+from test_bass import BassGenerator
+from test_drum import DrumGenerator
+from structure_manager import StructureManager
+
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, "result")
+
+# (lane, track name, GM program) in MIDI track order; percussion has no program
+TRACK_LAYOUT = [
+    ("chord", "Piano", 0),
+    ("melody", "Acoustic Guitar", 24),
+    ("bass", "Electric Bass", 33),
+    ("drum", "Percussion", None),
+]
+
+MOODS = ["chill", "energetic"]
+SCALES = ["major", "minor"]
+
+TEMPLATE_FILES = {
+    "intro": "intro_progresion.json",
+    "verse": "verse.json",
+    "chorus": "chorus_progresion.json",
+    "bridge": "bridge_progresion.json",
+    "outro": "outro_progresion.json"
+}
+
+# Source files whose contents define what a seed renders to
+GENERATOR_SOURCES = [
+    os.path.join(BASE_DIR, name)
+    for name in ("composer.py", "structure_manager.py", "test_bass.py", "test_drum.py")
+] + [
+    os.path.join(PROJECT_ROOT, 'utils', name)
+    for name in sorted(os.listdir(os.path.join(PROJECT_ROOT, 'utils'))) if name.endswith('.py')
+]
+
+_generator_version = None
+
+def generator_version():
+    """Hash of the generator source files, computed once per process."""
+    global _generator_version
+    if _generator_version is None:
+        _generator_version = fingerprint_files(GENERATOR_SOURCES)
+    return _generator_version
+
+def template_set_hash():
+    """Hash of the parsed templates and note data."""
+    return fingerprint_files([NOTES_PATH]) + get_registry().fingerprint()
+
+def resolve_seed(seed=None):
+    return str(seed) if seed not in (None, "") else str(int(time.time()))
+
+NOTES_PATH = os.path.join(PROJECT_ROOT, 'data', 'note', 'note.json')
+
+_notes = (None, None)  # (file mtime, parsed note data)
+
+def load_notes():
+    """Parsed note.json, re-read only when the file changes."""
+    global _notes
+    mtime = os.stat(NOTES_PATH).st_mtime_ns
+    cached_mtime, data = _notes
+    if data is None or cached_mtime != mtime:
+        with open(NOTES_PATH, 'r') as file:
+            data = json.load(file)
+        _notes = (mtime, data)
+    return data
+
+def load_templates(filename="song_progresion.json"):
+    return get_registry().get(filename)
+
+def load_atmosphere(mood="chill"):
+    data = get_registry().get('atmosphere.json')
+    if not data:
+        return {"bpm_range": [80, 100], "velocity_range": [60, 80]}
+    return data.get(mood, data["chill"])
+
+def load_structures():
+    return get_registry().get('structure_variation.json')
+
+_progression_model = (None, None)  # (template fingerprint, model)
+
+def progression_model():
+    """Markov progression model trained on the current templates, retrained when they change."""
+    global _progression_model
+    registry = get_registry()
+    fingerprint = registry.fingerprint()
+    cached_fingerprint, model = _progression_model
+    if model is None or cached_fingerprint != fingerprint:
+        section_files = dict(TEMPLATE_FILES, song="song_progresion.json")
+        model = ProgressionModel.from_templates(registry.get, section_files, registry.get('atmosphere.json'))
+        _progression_model = (fingerprint, model)
+    return model
+
+def plan_song(seed=None, repeat_sections=(), structure=None, mood=None, with_sections=True, verbose=True):
+    """
+    Resolve the song-level decisions for a seed into a SongPlan: key,
+    scale, mood, tempo, structure and (unless `with_sections` is False)
+    each section's progression. `structure` and `mood` pin those choices
+    (e.g. for benchmarks) without changing any other draw.
+
+    All randomness comes from SeedStreams derived from the seed, never the
+    global random module. The header draws (key, scale, mood, tempo,
+    structure) share one "song" stream in that order; each section's
+    progression has its own stream, so a header-only plan is a prefix of
+    the full plan and plans are independent of anything rendered afterwards.
+    """
+    current_seed = resolve_seed(seed)
+    rng = SeedStream(current_seed, "song")
+
+    notes_data = load_notes()
+    root_key = rng.choice(list(notes_data.keys()))
+    is_minor = rng.choice([True, False])
+    scale_type = 'minor' if is_minor else 'major'
+    category = scale_type
+
+    selected_mood = rng.choice(MOODS)
+    if mood is not None:
+        selected_mood = mood
+    mood_config = load_atmosphere(selected_mood)
+    target_bpm = rng.randint(mood_config["bpm_range"][0], mood_config["bpm_range"][1])
+
+    structures = load_structures()
+    if structures:
+        struct_name = rng.choice(list(structures.keys()))
+        if structure is not None:
+            struct_name = structure
+        song_flow = structures[struct_name]
+    else:
+        struct_name = "standard"
+        song_flow = ["intro", "verse", "chorus", "verse", "chorus", "outro"]
+
+    plan = SongPlan(current_seed, root_key, scale_type, selected_mood, target_bpm, struct_name,
+                    repeat_sections=repeat_sections)
+
+    if verbose:
+        print(f"--- Seed: {current_seed} ---")
+        print(f"--- Composition: {root_key} {scale_type.capitalize()} ({selected_mood.upper()}) ---")
+        print(f"--- Structure: {struct_name.upper()} ---")
+        print(f"--- Tempo: {target_bpm} BPM ---")
+
+    if not with_sections:
+        return plan
+
+    sections = []
+    for index, section in enumerate(song_flow):
+        if verbose:
+            print(f"Generating section: {section}...")
+        if section in repeat_sections:
+            prog_rng = SeedStream(current_seed, "section", section, "progression")
+        else:
+            prog_rng = SeedStream(current_seed, "section", index, section, "progression")
+        with span("progression", section=section):
+            filename = TEMPLATE_FILES.get(section, "song_progresion.json")
+            templates = load_templates(filename)
+
+            prog = None
+            if templates:
+                if section in templates and category in templates[section]:
+                    prog = prog_rng.choice(templates[section][category])
+                elif category in templates:
+                    prog = prog_rng.choice(templates[category])
+
+            from_template = bool(prog)
+            if not from_template:
+                prog = progression_model().generate(length=4, section=section, is_minor=is_minor,
+                                                    mood=selected_mood, rng=prog_rng)
+
+        if not from_template:
+            count("generated_progressions")
+        if verbose:
+            print(f"  -> Using {'template' if from_template else 'generated progression'}: {prog}")
+
+        sections.append((section, prog))
+
+    plan.sections = tuple((kind, tuple(prog)) for kind, prog in sections)
+    return plan
+
+def plan_choices():
+    """Known values of each plan field that can be constrained (see song_plan.parse_constraints)."""
+    return {
+        "key": list(load_notes().keys()),
+        "scale": SCALES,
+        "mood": MOODS,
+        "structure": list(load_structures() or {"standard": None}),
+    }
+
+def iter_plans(seeds, constraints=None, repeat_sections=(), with_sections=True):
+    """
+    Plans for `seeds` that satisfy `constraints` (see song_plan.parse_constraints),
+    in seed order. Only the song-level header is resolved for seeds that fail
+    the constraints, which are all song-level.
+    """
+    for seed in seeds:
+        if constraints:
+            plan = plan_song(seed, repeat_sections, with_sections=False, verbose=False)
+            if not plan.matches(constraints):
+                continue
+        plan = plan_song(seed, repeat_sections, with_sections=with_sections, verbose=False)
+        yield plan
+
+def prepare_song(seed=None, repeat_sections=(), structure=None, mood=None, plan=None):
+    """
+    Plan a song (or take `plan`) and attach each section's RNG stream.
+    Returns (song_info, sections) where sections is a list of
+    (section_type, progression, rng, is_last_section). Section types listed
+    in `repeat_sections` (e.g. {"chorus"}) share one RNG stream across the
+    song, so every repeat is identical.
+    """
+    if plan is None:
+        plan = plan_song(seed, repeat_sections, structure, mood)
+    last = len(plan.sections) - 1
+    sections = [(kind, list(prog), rng, index == last)
+                for index, ((kind, prog), rng) in enumerate(zip(plan.sections, plan.section_streams()))]
+    return plan.song_info(), sections
+
+def generate_sections(song_info, sections, executor=None, section_cache=None):
+    """Generate (chord, melody, bass, drum) event parts for each planned section."""
+    return StructureManager.create_song(
+        sections, song_info["key"], song_info["scale"], MusicTheory,
+        BassGenerator, DrumGenerator, InstrumentManager, song_info["mood"],
+        executor=executor, cache=section_cache
+    )
+
+def section_length(progression, lanes):
+    """Quarter lengths a section occupies: 4 per bar, or longer if a lane overruns."""
+    return max([len(progression) * 4.0] + [part.duration for part in lanes])
+
+def compose_song(seed=None, executor=None, section_cache=None, repeat_sections=(), plan=None):
+    """
+    Compose a full song for a seed (or a SongPlan) and return (event parts
+    by lane, song_info). Sections and instrument lanes are scheduled on
+    `executor` when one is given; `section_cache` (a SectionCache) reuses
+    generated sections.
+    """
+    song_info, sections = prepare_song(seed, repeat_sections, plan=plan)
+    generated = generate_sections(song_info, sections, executor, section_cache)
+    return assemble_song(sections, generated), song_info
+
+def assemble_song(sections, generated):
+    """
+    Stitch generated sections into one EventPart per lane, keyed by lane.
+    Every lane of a section starts at the section's position in the song,
+    so lanes that sit out a section stay aligned with the others.
+    """
+    full_chord = EventPart(LANE_CHANNELS["chord"])
+    full_melody = EventPart(LANE_CHANNELS["melody"])
+    full_bass = EventPart(LANE_CHANNELS["bass"])
+    full_drum = EventPart(LANE_CHANNELS["drum"])
+    full_parts = (full_chord, full_melody, full_bass, full_drum)
+
+    with span("assembly"):
+        position = 0.0
+        for (_, prog, _, _), lanes in zip(sections, generated):
+            for full, part in zip(full_parts, lanes):
+                full.advance_to(position)
+                full.extend(part)
+            position += section_length(prog, lanes)
+
+    return {"chord": full_chord, "melody": full_melody, "bass": full_bass, "drum": full_drum}
+
+def build_score(parts, song_info):
+    """Convert generated event parts into a music21 Score."""
+    from music21 import stream, metadata, tempo, instrument
+
+    song = stream.Score()
+    song.metadata = metadata.Metadata(title=f"L-Gen {song_info['seed']}")
+
+    full_chord = stream.Part()
+    full_melody = stream.Part()
+    full_bass = stream.Part()
+    full_drum = stream.Part()
+
+    full_chord.append(instrument.Piano())
+    full_chord.append(tempo.MetronomeMark(number=song_info['bpm']))
+    full_melody.append(instrument.AcousticGuitar())
+    full_bass.append(instrument.ElectricBass())
+    full_drum.append(instrument.Percussion())
+
+    parts["chord"].to_music21(full_chord)
+    parts["melody"].to_music21(full_melody)
+    parts["bass"].to_music21(full_bass)
+    parts["drum"].to_music21(full_drum)
+
+    song.insert(0, full_chord)
+    song.insert(0, full_melody)
+    song.insert(0, full_bass)
+    song.insert(0, full_drum)
+    return song
+
+def write_song_midi(parts, song_info, fp):
+    """Write event parts as a Standard MIDI File to a path or binary file object."""
+    tracks = [MidiTrack(name, program, parts[lane].channel, parts[lane].events)
+              for lane, name, program in TRACK_LAYOUT]
+    with span("midi_write"):
+        write_midi(tracks, song_info['bpm'], fp)
+
+def song_filename(song_info):
+    return f"{song_info['key']}_{song_info['scale'].capitalize()}_{song_info['seed']}.mid"
+
+def render_song(seed=None, output_dir=OUTPUT_DIR, executor=None, section_cache=None, repeat_sections=(), render_cache=None,
+                plan=None):
+    """
+    Compose a song and write it as MIDI. Returns (output_file, song_info).
+    With a `plan` (SongPlan), its seed and decisions are rendered as given.
+    With a RenderCache, a seed already rendered by the same code and
+    templates is linked from the cache instead of being composed again.
+    """
+    if plan is not None:
+        seed, repeat_sections = plan.seed, plan.repeat_sections
+    current_seed = resolve_seed(seed)
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    cache_key = None
+    if render_cache is not None:
+        options = {"repeat_sections": sorted(repeat_sections)}
+        if plan is not None:
+            options["plan"] = plan.to_dict()
+        cache_key = RenderCache.make_key(current_seed, template_set_hash(), generator_version(), **options)
+        cached = render_cache.get(cache_key)
+        if cached is not None:
+            midi_path, song_info = cached
+            output_file = os.path.join(output_dir, song_filename(song_info))
+            # An eviction can remove the entry between get() and export(); compose it again then
+            if RenderCache.export(midi_path, output_file):
+                count("render_cache", result="hit")
+                return output_file, song_info
+        count("render_cache", result="miss")
+
+    parts, song_info = compose_song(current_seed, executor, section_cache, repeat_sections, plan)
+    output_file = os.path.join(output_dir, song_filename(song_info))
+
+    if cache_key is None:
+        write_song_midi(parts, song_info, output_file)
+    else:
+        buffer = io.BytesIO()
+        write_song_midi(parts, song_info, buffer)
+        midi_path = render_cache.put(cache_key, buffer.getvalue(), song_info)
+        if not RenderCache.export(midi_path, output_file):
+            with open(output_file, 'wb') as f:
+                f.write(buffer.getvalue())
+    return output_file, song_info
+
+def render_transpositions(seed=None, keys=(), output_dir=OUTPUT_DIR, executor=None, section_cache=None, repeat_sections=()):
+    """
+    Compose a song once in its own key and write one MIDI file per key in
+    `keys` (note names such as "D" or "Eb"). Returns [(output_file, song_info)]
+    in the order of `keys`; each song_info records the reference key and shift.
+    """
+    current_seed = resolve_seed(seed)
+    if not os.path.exists(output_dir): os.makedirs(output_dir)
+
+    parts, song_info = compose_song(current_seed, executor, section_cache, repeat_sections)
+    reference_key = song_info["key"]
+    results = []
+    for key in keys or [reference_key]:
+        shift = key_offset(reference_key, key)
+        variant = dict(song_info, key=key, reference_key=reference_key, transpose=shift)
+        with span("transpose", key=key):
+            transposed = transpose_parts(parts, shift)
+        output_file = os.path.join(output_dir, song_filename(variant))
+        write_song_midi(transposed, variant, output_file)
+        results.append((output_file, variant))
+    return results
@@ -0,0 +1,68 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from composer import render_song, OUTPUT_DIR
+from utils.music_theory import MusicTheory
+from utils.section_cache import SectionCache
+
+class RenderDaemon:
+    """
+    Long-lived in-process renderer.
+    The generators and templates are loaded once; seeds are taken from a
+    queue and rendered on a single warm worker thread.
+    """
+
+    _STOP = object()
+
+    def __init__(self, output_dir=OUTPUT_DIR, repeat_sections=(), render_cache=None):
+        self.output_dir = output_dir
+        self.repeat_sections = repeat_sections
+        self.render_cache = render_cache
+        self.section_cache = SectionCache()
+        self.requests = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="render-daemon", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            self.requests.put(self._STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, seed):
+        """Queue a seed for rendering. The future resolves to (midi_path, song_info)."""
+        future = Future()
+        self.requests.put((seed, future))
+        return future
+
+    def render(self, seed, timeout=None):
+        return self.submit(seed).result(timeout)
+
+    def _run(self):
+        MusicTheory.build_tables()
+        while True:
+            item = self.requests.get()
+            if item is self._STOP:
+                break
+
+            seed, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(render_song(seed, self.output_dir, section_cache=self.section_cache,
+                                              repeat_sections=self.repeat_sections,
+                                              render_cache=self.render_cache))
+            except Exception as e:
+                future.set_exception(e)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,131 @@
+import os
+import queue
+import random
+import threading
+import time
+
+def random_seeds():
+    while True:
+        yield random.randint(100000, 999999)
+
+class LookaheadQueue:
+    """
+    Bounded producer/consumer pipeline in front of a RenderDaemon.
+    A producer thread keeps up to `depth` finished tracks ready while the
+    current one plays; when the queue is full the producer blocks
+    (backpressure). Reading from an empty queue counts as an underrun.
+    """
+
+    def __init__(self, daemon, seeds=None, depth=3):
+        if depth < 1:
+            raise ValueError(f"Lookahead depth must be >= 1, got {depth}")
+        self.daemon = daemon
+        self.seeds = iter(seeds) if seeds is not None else random_seeds()
+        self.depth = depth
+        self.tracks = queue.Queue(maxsize=depth)
+        self.metrics = {
+            "rendered": 0,
+            "render_errors": 0,
+            "played": 0,
+            "underruns": 0,
+            "underrun_wait": 0.0,
+            "backpressure_wait": 0.0,
+            "discarded": 0,
+        }
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._produce, name="render-lookahead", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop the producer and delete the MIDI files of tracks that were
+        rendered but never handed out. The producer waits on a full queue
+        with a timeout, so it sees the stop flag without a slot being freed.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        while True:
+            try:
+                _, midi_path, _ = self.tracks.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(midi_path)
+
+    def get(self, timeout=None):
+        """Next rendered track as (seed, midi_path, song_info), blocking on underrun."""
+        try:
+            item = self.tracks.get_nowait()
+        except queue.Empty:
+            started = time.perf_counter()
+            item = self.tracks.get(timeout=timeout)
+            with self._lock:
+                self.metrics["underruns"] += 1
+                self.metrics["underrun_wait"] += time.perf_counter() - started
+
+        with self._lock:
+            self.metrics["played"] += 1
+        return item
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.metrics)
+        data["queued"] = self.tracks.qsize()
+        data["depth"] = self.depth
+        return data
+
+    def _produce(self):
+        while not self._stopped.is_set():
+            try:
+                seed = next(self.seeds)
+            except StopIteration:
+                break
+
+            try:
+                midi_path, song_info = self.daemon.render(seed)
+            except Exception as e:
+                print(f"[ERROR] Render failed for seed {seed}: {e}")
+                with self._lock:
+                    self.metrics["render_errors"] += 1
+                continue
+
+            with self._lock:
+                self.metrics["rendered"] += 1
+
+            started = time.perf_counter()
+            queued = False
+            while not self._stopped.is_set():
+                try:
+                    self.tracks.put((seed, midi_path, song_info), timeout=0.5)
+                    queued = True
+                    break
+                except queue.Full:
+                    continue
+            with self._lock:
+                self.metrics["backpressure_wait"] += time.perf_counter() - started
+            if not queued:
+                self._discard(midi_path)
+
+    def _discard(self, midi_path):
+        """Remove a rendered track that will never be played."""
+        try:
+            os.remove(midi_path)
+        except OSError as e:
+            print(f"[ERROR] Cleanup failed: {e}")
+            return
+        with self._lock:
+            self.metrics["discarded"] += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
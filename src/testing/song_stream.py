@@ -0,0 +1,134 @@
+"""
+Song Stream
+Generator API that composes a song section by section and yields it bar
+by bar, so playback can start after the first section instead of after
+the whole song, and memory stays flat however long the song runs.
+"""
+
+import argparse
+import contextlib
+import sys
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BASE_DIR)
+
+from utils.events import LANE_CHANNELS, NoteEvent
+from utils.midi_stream import MessageScheduler, RealtimeSink, SMFStreamWriter
+from utils.midi_writer import TICKS_PER_QUARTER
+from utils.rng import SeedStream
+from utils.section_cache import SectionCache
+from composer import TRACK_LAYOUT, generate_sections, prepare_song, resolve_seed, section_length
+
+BAR_LENGTH = 4.0
+
+# (channel, program) for each lane, as set up at the start of a stream
+STREAM_CHANNELS = [(LANE_CHANNELS[lane], program) for lane, _, program in TRACK_LAYOUT]
+
+
+class SongStream:
+    """
+    One song, generated lazily. song_info is known as soon as the stream is
+    created; sections are only generated as iteration reaches them. Events
+    are the same as compose_song's for the same seed.
+    """
+
+    def __init__(self, seed=None, repeat_sections=(), section_cache=None):
+        self.song_info, self.sections = prepare_song(seed, repeat_sections)
+        # Repeated sections are reused from the cache instead of regenerated
+        self.section_cache = section_cache if section_cache is not None else SectionCache(max_entries=16)
+
+    def iter_sections(self):
+        """Yield (section_type, start, length, events) with absolute offsets, sorted by offset."""
+        position = 0.0
+        for section in self.sections:
+            section_type, prog = section[0], section[1]
+            lanes = generate_sections(self.song_info, [section], section_cache=self.section_cache)[0]
+
+            events = [
+                NoteEvent(ev.offset + position, ev.duration, ev.pitch, ev.velocity, LANE_CHANNELS[lane])
+                for (lane, _, _), part in zip(TRACK_LAYOUT, lanes)
+                for ev in part
+            ]
+            events.sort(key=lambda ev: ev.offset)
+
+            length = section_length(prog, lanes)
+            yield section_type, position, length, events
+            position += length
+
+    def iter_bars(self):
+        """Yield (bar_start, events) for every bar of the song, empty bars included."""
+        for _, start, length, events in self.iter_sections():
+            bar_count = int(-(-length // BAR_LENGTH))
+            bars = [[] for _ in range(bar_count)]
+            for ev in events:
+                index = min(int((ev.offset - start) // BAR_LENGTH), bar_count - 1)
+                bars[index].append(ev)
+            for index, bar in enumerate(bars):
+                yield start + index * BAR_LENGTH, bar
+
+    def messages(self, scheduler=None):
+        """Yield (tick, MIDI message) pairs in time order, one bar at a time."""
+        scheduler = scheduler or MessageScheduler()
+        for bar_start, events in self.iter_bars():
+            yield from scheduler.feed(events, until=bar_start + BAR_LENGTH)
+        yield from scheduler.flush()
+
+
+def stream_to_smf(song, fp):
+    """
+    Write a SongStream to a binary file object as a format 0 SMF. The file
+    is flushed once per bar, so a reader sees each bar as soon as it is
+    complete without a syscall per message.
+    """
+    bar_ticks = int(BAR_LENGTH * TICKS_PER_QUARTER)
+    next_bar = bar_ticks
+    with SMFStreamWriter(fp, song.song_info["bpm"], STREAM_CHANNELS) as writer:
+        for tick, message in song.messages():
+            if tick >= next_bar:
+                fp.flush()
+                next_bar = (tick // bar_ticks + 1) * bar_ticks
+            writer.write(tick, message)
+        fp.flush()
+
+def play_realtime(song, send):
+    """Send a SongStream's messages through `send(bytes)` as they fall due."""
+    with RealtimeSink(send, song.song_info["bpm"], STREAM_CHANNELS) as sink:
+        sink.write_all(song.messages())
+
+def random_seeds():
+    """
+    Endless distinct seeds from one stream rooted at the current time, so
+    songs started within the same second still differ.
+    """
+    picker = SeedStream(resolve_seed(), "endless")
+    while True:
+        yield str(picker.getrandbits(48))
+
+def endless(seeds=None, repeat_sections=()):
+    """Yield SongStreams back to back: the given seeds, or random ones forever."""
+    section_cache = SectionCache()
+    seeds = seeds if seeds is not None else random_seeds()
+    for seed in seeds:
+        yield SongStream(seed, repeat_sections, section_cache)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a song as it is generated")
+    parser.add_argument("--seed", default=None)
+    parser.add_argument("--device", default=None, help="Raw MIDI device to play to in real time (e.g. /dev/snd/midiC1D0)")
+    parser.add_argument("--repeat-chorus", action="store_true")
+    args = parser.parse_args()
+
+    repeat_sections = {"chorus"} if args.repeat_chorus else ()
+
+    # stdout carries the MIDI stream; progress output goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        song = SongStream(args.seed, repeat_sections)
+        if args.device:
+            with open(args.device, 'wb', buffering=0) as device:
+                play_realtime(song, device.write)
+        else:
+            stream_to_smf(song, sys.__stdout__.buffer)
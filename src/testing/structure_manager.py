@@ -1,78 +1,159 @@
-import random
-from music21 import stream, instrument, chord, note
 from test_drum import DrumGenerator
+from utils.events import EventPart, LANE_CHANNELS
+from utils.instrument_manager import LANE_BITS
+from utils.instrumentation import count, span
+from utils.rng import substream
+from utils.melody import MelodyEngine
+from utils.voice_leading import VoiceLeading
+from utils.section_cache import SectionCache
+
+LANES = ("chord", "melody", "bass", "drum")
+BAR_LENGTH = 4.0
 
 class StructureManager:
     @staticmethod
-    def create_section(section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, DrumGenerator_Param, InstrumentManager, mood="chill", is_last_section=False):
-        chord_part = stream.Part()
-        melody_part = stream.Part()
-        bass_part = stream.Part()
-        drum_part = stream.Part()
+    def create_section(section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, DrumGenerator_Param, InstrumentManager, mood="chill", is_last_section=False, rng=None, executor=None):
+        """
+        Generate one section as four event parts (chord, melody, bass, drum).
+        With a SeedStream, each lane draws from its own substream, so lanes
+        are independent of each other and of generation order. Lanes run on
+        `executor` (thread or process pool) when one is given.
+        """
+        args = (section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, InstrumentManager, mood, is_last_section, rng,
+                InstrumentManager.arrangement())
+        if executor is None:
+            return tuple(StructureManager.create_lane(lane, *args) for lane in LANES)
+
+        futures = [executor.submit(StructureManager.create_lane, lane, *args) for lane in LANES]
+        return tuple(f.result() for f in futures)
+
+    @staticmethod
+    def create_song(sections, root_key, scale_type, MusicTheory, BassGenerator, DrumGenerator_Param, InstrumentManager, mood="chill", executor=None, cache=None):
+        """
+        Generate every (section, lane) pair of a song.
+        `sections` is a list of (section_type, progression, rng, is_last_section).
+        All pairs are scheduled on `executor` at once and returned in song
+        order as (chord, melody, bass, drum) tuples, so the result does not
+        depend on which task finishes first. With a SectionCache, sections
+        whose inputs and RNG path were generated before are reused, as are
+        identical sections repeated within the song.
+        """
+        arrangement = InstrumentManager.arrangement()  # resolved once for the whole song
+        plan = []  # per section: ("new", key, lanes) | ("cached", parts) | ("repeat", index)
+        first_seen = {}
+        for section_type, progression, rng, is_last_section in sections:
+            key = None
+            if cache is not None:
+                key = SectionCache.make_key(section_type, progression, root_key, scale_type, mood, is_last_section, rng,
+                                            arrangement.bar_masks(section_type, mood))
+                if key is not None and key in first_seen:
+                    cache.record_hit()
+                    count("section_cache", result="repeat")
+                    plan.append(("repeat", first_seen[key]))
+                    continue
+                cached = cache.get(key) if key is not None else None
+                count("section_cache", result="miss" if cached is None else "hit")
+                if cached is not None:
+                    plan.append(("cached", cached))
+                    continue
+                if key is not None:
+                    first_seen[key] = len(plan)
+
+            args = (section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, InstrumentManager, mood, is_last_section, rng,
+                    arrangement)
+            if executor is None:
+                lanes = tuple(StructureManager.create_lane(lane, *args) for lane in LANES)
+            else:
+                lanes = tuple(executor.submit(StructureManager.create_lane, lane, *args) for lane in LANES)
+            plan.append(("new", key, lanes))
+
+        song = []
+        for entry in plan:
+            if entry[0] == "repeat":
+                song.append(song[entry[1]])
+            elif entry[0] == "cached":
+                song.append(entry[1])
+            else:
+                _, key, lanes = entry
+                if executor is not None:
+                    lanes = tuple(f.result() for f in lanes)
+                if key is not None:
+                    cache.put(key, lanes)
+                song.append(lanes)
+        return song
+
+    @staticmethod
+    def create_lane(lane, section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, InstrumentManager, mood="chill", is_last_section=False, rng=None, arrangement=None):
+        """
+        Generate a single instrument lane of a section as an EventPart.
+        `arrangement` (an ArrangementMatrix) decides which bars the lane
+        plays; bars it sits out are left as rests.
+        """
+        if arrangement is None:
+            arrangement = InstrumentManager.arrangement()
+        with span("lane", lane=lane, section=section_type):
+            return StructureManager._create_lane(lane, section_type, progression, root_key, scale_type, MusicTheory,
+                                                 BassGenerator, mood, is_last_section, rng, arrangement)
+
+    @staticmethod
+    def _create_lane(lane, section_type, progression, root_key, scale_type, MusicTheory, BassGenerator, mood, is_last_section, rng, arrangement):
+        part = EventPart(LANE_CHANNELS[lane])
+        bit = LANE_BITS[lane]
+        bar_masks = arrangement.bar_masks(section_type, mood)
+        # The song always ends on the drums' final hit, even where the arrangement rests them
+        final_hit = lane == "drum" and is_last_section
+        if not final_hit and not any(mask & bit for mask in bar_masks):
+            return part
 
         velocity_multiplier = 1.2 if section_type == "chorus" else 1.0
         is_minor = (scale_type == 'minor')
+        lane_rng = substream(rng, lane)
+
+        voicings = VoiceLeading.voice_roman_progression(progression, root_key, is_minor) if lane == "chord" else None
+        melody = None
+        if lane == "melody":
+            chords = [MusicTheory.parse_roman_numeral(symbol, root_key, is_minor) for symbol in progression]
+            melody = MelodyEngine.generate_section(chords, root_key, scale_type, section_type, mood, lane_rng)
 
         for index, symbol in enumerate(progression):
+            if not bar_masks[index % len(bar_masks)] & bit and not (final_hit and index == len(progression) - 1):
+                part.advance_to(part.duration + BAR_LENGTH)
+                continue
+
             chord_root, chord_type = MusicTheory.parse_roman_numeral(symbol, root_key, is_minor)
-            midi_notes = MusicTheory.get_chord(chord_root, chord_type, octave=4)
-            
             is_last_bar = (index == len(progression) - 1)
-            
-            if InstrumentManager.should_play("chord", section_type, mood):
+
+            if lane == "chord":
+                voicing = voicings[index]
                 if section_type in ["verse", "chorus"]:
-                    voicing = MusicTheory.get_voicing(midi_notes, voicing_type='open')
                     for i, m_note in enumerate(voicing):
-                        n_name, n_oct = MusicTheory.midi_to_note(m_note)
-                        arp_n = note.Note(f"{n_name}{n_oct}")
-                        arp_n.quarterLength = 1.0
-                        arp_n.volume.velocity = int((60 + (i * 10)) * velocity_multiplier)
-                        chord_part.append(arp_n)
+                        part.append(1.0, m_note, int((60 + (i * 10)) * velocity_multiplier))
                 else:
-                    c = chord.Chord(MusicTheory.get_voicing(midi_notes, voicing_type='open'))
-                    c.quarterLength = 4.0
-                    c.volume.velocity = int(60 * velocity_multiplier)
-                    chord_part.append(c)
-
-            if InstrumentManager.should_play("melody", section_type, mood):
-                m_octave = 6 if section_type == "chorus" else 5
-                chord_indices = MusicTheory.get_chord_notes_indices(chord_root, chord_type)
-                scale_indices = MusicTheory.SCALES.get(scale_type, [0, 2, 4, 5, 7, 9, 11])
-                root_idx = MusicTheory.NOTE_MAP[root_key.capitalize()]
-
-                for beat in range(4):
-                    if beat % 2 == 0:
-                        chosen_idx = random.choice(chord_indices)
-                    else:
-                        chosen_idx = (root_idx + random.choice(scale_indices)) % 12
-                    
-                    n_name, _ = MusicTheory.midi_to_note(chosen_idx)
-                    m_n = note.Note(f"{n_name}{m_octave}")
-                    m_n.quarterLength = 1.0
-                    m_n.volume.velocity = int(70 * velocity_multiplier)
-                    melody_part.append(m_n)
-
-            if InstrumentManager.should_play("bass", section_type, mood):
+                    part.append(4.0, tuple(voicing), int(60 * velocity_multiplier))
+
+            elif lane == "melody":
+                for duration, pitch, velocity in melody[index]:
+                    part.append(duration, pitch, int(velocity * velocity_multiplier))
+
+            elif lane == "bass":
                 is_chorus_section = (section_type == "chorus")
-                bass_notes_list = BassGenerator.generate_bass_part(chord_root, is_chorus=is_chorus_section)
-                for b_n in bass_notes_list:
-                    if b_n is not None:
-                        base_vel = b_n.volume.velocity if b_n.volume.velocity is not None else 80
-                        b_n.volume.velocity = int(base_vel * velocity_multiplier)
-                        bass_part.append(b_n)
-
-            if InstrumentManager.should_play("drum", section_type, mood):
+                bass_events = BassGenerator.generate_bass_part(chord_root, is_chorus=is_chorus_section, rng=lane_rng)
+                for b_n in bass_events:
+                    base_vel = b_n.velocity if b_n.velocity is not None else 80
+                    b_n.velocity = int(base_vel * velocity_multiplier)
+                part.append_events(bass_events)
+
+            elif lane == "drum":
                 if is_last_section and is_last_bar:
-                    drum_notes = DrumGenerator.generate_final_hit()
+                    drum_notes = DrumGenerator.generate_final_hit(lane_rng, mood)
                 elif is_last_bar and section_type in ["chorus", "bridge"]:
-                    drum_notes = DrumGenerator.generate_fill()
+                    drum_notes = DrumGenerator.generate_fill(lane_rng, mood)
                 else:
-                    drum_notes = DrumGenerator.generate_standard_beat()
+                    drum_notes = DrumGenerator.generate_standard_beat(lane_rng, mood)
 
                 for drum_note in drum_notes:
-                    if drum_note is not None:
-                        base_vel = drum_note.volume.velocity if drum_note.volume.velocity is not None else 90
-                        drum_note.volume.velocity = int(base_vel * velocity_multiplier)
-                        drum_part.append(drum_note)
+                    base_vel = drum_note.velocity if drum_note.velocity is not None else 90
+                    drum_note.velocity = int(base_vel * velocity_multiplier)
+                part.append_events(drum_notes)
 
-        return chord_part, melody_part, bass_part, drum_part
+        return part
@@ -1,10 +1,6 @@
-import json
-import random
 import sys
 import os
-import time
 import argparse
-from music21 import stream, metadata, tempo, instrument
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
@@ -12,154 +8,154 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
 sys.path.append(PROJECT_ROOT)
 sys.path.append(BASE_DIR)
 
-from utils.music_theory import MusicTheory
-from utils.instrument_manager import InstrumentManager
 from utils.overlay_manager import OverlayManager
-from test_bass import BassGenerator
-from test_drum import DrumGenerator
-from structure_manager import StructureManager 
-
-def load_notes():
-    with open(os.path.join(PROJECT_ROOT, 'data', 'note', 'note.json'), 'r') as file:
-        return json.load(file)
-
-def load_templates(filename="song_progresion.json"):
-    template_path = os.path.join(PROJECT_ROOT, 'data', 'templates', filename)
-    try:
-        if os.path.exists(template_path):
-            with open(template_path, 'r') as file:
-                return json.load(file)
-        return None
-    except Exception as e:
-        print(f"Warning: {e}")
-        return None
-
-def load_atmosphere(mood="chill"):
-    path = os.path.join(PROJECT_ROOT, 'data', 'templates', 'atmosphere.json')
-    try:
-        with open(path, 'r') as f:
-            data = json.load(f)
-        return data.get(mood, data["chill"])
-    except:
-        return {"bpm_range": [80, 100], "velocity_range": [60, 80]}
-
-def load_structures():
-    path = os.path.join(PROJECT_ROOT, 'data', 'templates', 'structure_variation.json')
-    try:
-        if os.path.exists(path):
-            with open(path, 'r') as f:
-                return json.load(f)
-        return None
-    except:
-        return None
+from composer import plan_choices, render_song, render_transpositions
+from utils.music_theory import MusicTheory
+from utils.section_cache import SectionCache
+from utils.render_cache import RenderCache
+from utils import instrumentation
+from utils.audio_render import AudioRenderPool, BACKENDS, get_backend
+from utils.song_plan import SongPlan, parse_constraints
+from batch_renderer import iter_seed_range, parse_seed_range, plan_batch, render_batch, report_audio
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--seed", type=str, default=None)
+    parser.add_argument("--seeds", type=str, default=None, help="Batch mode, e.g. 1000-50000 or 1,5,10-20")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--repeat-chorus", action="store_true", help="Repeat one identical chorus throughout the song")
+    parser.add_argument("--keys", type=str, default=None, help="Compose once and write it in these keys, e.g. C,Eb,G or all")
+    parser.add_argument("--plan-only", action="store_true", help="Only compute song plans (JSON lines) for --seed/--seeds")
+    parser.add_argument("--match", type=str, default=None, help="Plan filter, e.g. key=C,mood=energetic,bpm=120-130")
+    parser.add_argument("--plans-out", type=str, default=None, help="Write plans to this file instead of stdout")
+    parser.add_argument("--from-plans", type=str, default=None, help="Render every plan in this JSON-lines file")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Reuse renders from this on-disk cache")
+    parser.add_argument("--cache-max-mb", type=float, default=None, help="Evict cached renders beyond this size")
+    parser.add_argument("--cache-max-days", type=float, default=None, help="Evict cached renders older than this")
+    parser.add_argument("--audio", choices=sorted(BACKENDS), default=None, help="Also render WAV audio with this backend")
+    parser.add_argument("--audio-workers", type=int, default=2, help="Concurrent audio renders")
+    parser.add_argument("--audio-timeout", type=float, default=120, help="Seconds allowed per audio render")
+    parser.add_argument("--metrics-json", type=str, default=None, help="Write per-stage timings and counters as JSON")
+    parser.add_argument("--metrics-prom", type=str, default=None, help="Write per-stage timings in Prometheus text format")
+    parser.add_argument("--trace-log", type=str, default=None, help="Append one JSON line per timed span")
     args = parser.parse_args()
 
-    current_seed = args.seed if args.seed else str(int(time.time()))
-    random.seed(current_seed)
+    if args.keys and args.seeds:
+        parser.error("--keys works with a single --seed")
+
+    if args.match and not args.plan_only:
+        parser.error("--match works with --plan-only")
+    if args.plans_out and not args.plan_only:
+        parser.error("--plans-out works with --plan-only")
+    if args.plan_only and (args.keys or args.from_plans):
+        parser.error("--plan-only cannot be combined with --keys or --from-plans")
+    if args.from_plans and (args.seed or args.seeds or args.keys):
+        parser.error("--from-plans takes its seeds from the plan file; drop --seed/--seeds/--keys")
+    constraints = None
+    if args.match:
+        try:
+            constraints = parse_constraints(args.match, plan_choices())
+        except ValueError as e:
+            parser.error(str(e))
+
+    repeat_sections = ("chorus",) if args.repeat_chorus else ()
+    keys = None
+    if args.keys:
+        keys = MusicTheory.NOTES_SHARP if args.keys == "all" else [k.strip() for k in args.keys.split(",") if k.strip()]
+        unknown = [k for k in keys if k.capitalize() not in MusicTheory.NOTE_MAP]
+        if unknown:
+            parser.error(f"unknown keys: {', '.join(unknown)}")
+        keys = [k.capitalize() for k in keys]
+    cache_options = None
+    if args.cache_dir:
+        cache_options = {
+            "cache_dir": args.cache_dir,
+            "max_bytes": int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None,
+            "max_age": args.cache_max_days * 86400 if args.cache_max_days else None,
+        }
+
+    trace_log = None
+    if args.metrics_json or args.metrics_prom or args.trace_log:
+        instrumentation.enable()
+    if args.trace_log:
+        trace_log = open(args.trace_log, 'a')
+        instrumentation.add_hook(instrumentation.JsonLogHook(trace_log))
+
+    audio_pool = None
+    if args.audio:
+        audio_pool = AudioRenderPool(get_backend(args.audio), workers=args.audio_workers, timeout=args.audio_timeout)
 
     try:
-        notes_data = load_notes()
-        root_key = random.choice(list(notes_data.keys()))
-        is_minor = random.choice([True, False])
-        scale_type = 'minor' if is_minor else 'major'
-        category = scale_type
-        
-        moods = ["chill", "energetic"]
-        selected_mood = random.choice(moods)
-        mood_config = load_atmosphere(selected_mood)
-        target_bpm = random.randint(mood_config["bpm_range"][0], mood_config["bpm_range"][1])
-
-        structures = load_structures()
-        if structures:
-            struct_name = random.choice(list(structures.keys()))
-            song_flow = structures[struct_name]
+        if args.plan_only:
+            seeds = iter_seed_range(args.seeds) if args.seeds else [args.seed]
+            out = open(args.plans_out, 'w') if args.plans_out else sys.stdout
+            try:
+                plan_batch(seeds, out, constraints, workers=args.workers, repeat_sections=repeat_sections)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        elif args.from_plans:
+            section_cache = SectionCache()
+            render_cache = RenderCache(**cache_options) if cache_options else None
+            plans = []
+            with open(args.from_plans) as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        plans.append(SongPlan.from_json(line))
+                    except (ValueError, KeyError, TypeError) as e:
+                        parser.error(f"{args.from_plans}:{lineno}: invalid plan ({type(e).__name__}: {e})")
+            output_files = []
+            for plan in plans:
+                output_file, _ = render_song(plan=plan, section_cache=section_cache, render_cache=render_cache)
+                output_files.append(output_file)
+            print(f"SUCCESS: Rendered {len(output_files)} planned songs")
+
+            if audio_pool is not None:
+                report_audio(audio_pool.map(output_files))
+        elif args.seeds:
+            render_batch(parse_seed_range(args.seeds), workers=args.workers, repeat_sections=repeat_sections,
+                         cache_options=cache_options, audio_pool=audio_pool)
+        elif keys:
+            section_cache = SectionCache()
+            variants = render_transpositions(args.seed, keys, section_cache=section_cache, repeat_sections=repeat_sections)
+            for output_file, song_info in variants:
+                print(f"[TRANSPOSE] {song_info['reference_key']} -> {song_info['key']} ({song_info['transpose']:+d}): {output_file}")
+
+            overlay = OverlayManager()
+            overlay.update_metadata(variants[0][1])
+
+            print(f"SUCCESS: Saved {len(variants)} transpositions")
+
+            if audio_pool is not None:
+                report_audio(audio_pool.map(output_file for output_file, _ in variants))
         else:
-            struct_name = "standard"
-            song_flow = ["intro", "verse", "chorus", "verse", "chorus", "outro"]
-
-        overlay = OverlayManager()
-        overlay_data = {
-            "seed": current_seed,
-            "key": root_key,
-            "scale": scale_type,
-            "mood": selected_mood,
-            "bpm": target_bpm,
-            "structure": struct_name
-        }
-        overlay.update_metadata(overlay_data)
-
-        print(f"--- Seed: {current_seed} ---")
-        print(f"--- Composition: {root_key} {scale_type.capitalize()} ({selected_mood.upper()}) ---")
-        print(f"--- Structure: {struct_name.upper()} ---")
-        print(f"--- Tempo: {target_bpm} BPM ---")
-
-        song = stream.Score()
-        song.metadata = metadata.Metadata(title=f"L-Gen {current_seed}")
-        
-        full_chord = stream.Part()
-        full_melody = stream.Part()
-        full_bass = stream.Part()
-        full_drum = stream.Part()
-
-        full_chord.append(instrument.Piano())
-        full_chord.append(tempo.MetronomeMark(number=target_bpm))
-        full_melody.append(instrument.AcousticGuitar())
-        full_bass.append(instrument.ElectricBass())
-        full_drum.append(instrument.Percussion())
-        
-        template_files = {
-            "intro": "intro_progresion.json",
-            "verse": "verse.json",
-            "chorus": "chorus_progresion.json",
-            "bridge": "bridge_progresion.json",
-            "outro": "outro_progresion.json"
-        }
+            section_cache = SectionCache()
+            render_cache = RenderCache(**cache_options) if cache_options else None
+            output_file, song_info = render_song(args.seed, section_cache=section_cache, repeat_sections=repeat_sections,
+                                                 render_cache=render_cache)
+            stats = section_cache.stats()
+            print(f"[CACHE] Sections: {stats['hits']} hits, {stats['misses']} misses")
+
+            overlay = OverlayManager()
+            overlay.update_metadata(song_info)
+
+            print(f"SUCCESS: Saved to {output_file}")
 
-        for section in song_flow:
-            print(f"Generating section: {section}...")
-            filename = template_files.get(section, "song_progresion.json")
-            templates = load_templates(filename)
-            
-            prog = None
-            if templates:
-                if section in templates and category in templates[section]:
-                    prog = random.choice(templates[section][category])
-                elif category in templates:
-                    prog = random.choice(templates[category])
-
-            if not prog:
-                prog = MusicTheory.generate_random_progression(length=4, key=root_key, is_minor=is_minor)
-                print(f"  -> Using random progression: {prog}")
-            else:
-                print(f"  -> Using template: {prog}")
-            
-            c_p, m_p, b_p, d_p = StructureManager.create_section(
-                section, prog, root_key, scale_type, MusicTheory, 
-                BassGenerator, DrumGenerator, InstrumentManager, selected_mood
-            )
-            
-            for n in c_p: full_chord.append(n)
-            for n in m_p: full_melody.append(n)
-            for n in b_p: full_bass.append(n)
-            for n in d_p: full_drum.append(n)
-
-        song.insert(0, full_chord)
-        song.insert(0, full_melody)
-        song.insert(0, full_bass)
-        song.insert(0, full_drum)
-        
-        OUTPUT_DIR = os.path.join(PROJECT_ROOT, "result")
-        if not os.path.exists(OUTPUT_DIR): os.makedirs(OUTPUT_DIR)
-
-        filename = f"{root_key}_{scale_type.capitalize()}_{current_seed}.mid"
-        output_file = os.path.join(OUTPUT_DIR, filename)
-        
-        song.write('midi', fp=output_file)
-        print(f"SUCCESS: Saved to {output_file}")
+            if audio_pool is not None:
+                report_audio([audio_pool.submit(output_file).result()])
 
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        if audio_pool is not None:
+            audio_pool.close()
+        if trace_log is not None:
+            trace_log.close()
+        if args.metrics_json:
+            with open(args.metrics_json, 'w') as f:
+                f.write(instrumentation.to_json(indent=2))
+        if args.metrics_prom:
+            with open(args.metrics_prom, 'w') as f:
+                f.write(instrumentation.prometheus_text())
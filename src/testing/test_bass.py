@@ -1,23 +1,26 @@
-import random
-from music21 import note
+import sys
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+sys.path.append(PROJECT_ROOT)
+
+from utils.music_theory import MusicTheory
+from utils.events import sequence
+from utils.rng import resolve
 
 class BassGenerator:
     @staticmethod
-    def generate_bass_part(chord_root, is_chorus=False):
+    def generate_bass_part(chord_root, is_chorus=False, rng=None):
+        rng = resolve(rng)
         notes = []
-        root_name = chord_root
+        root_pc = MusicTheory.pitch_class(chord_root)
         
         if not is_chorus:
-            b = note.Note(f"{root_name}2")
-            b.quarterLength = 4.0
-            b.volume.velocity = random.randint(70, 80)
-            notes.append(b)
+            notes.append((4.0, 36 + root_pc, rng.randint(70, 80)))  # octave 2
         else:
             for i in range(4):
                 octave = 2 if i % 2 == 0 else 3
-                b = note.Note(f"{root_name}{octave}")
-                b.quarterLength = 1.0
-                b.volume.velocity = random.randint(90, 100)
-                notes.append(b)
+                notes.append((1.0, (octave + 1) * 12 + root_pc, rng.randint(90, 100)))
         
-        return notes
\ No newline at end of file
+        return sequence(notes)
\ No newline at end of file
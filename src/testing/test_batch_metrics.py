@@ -0,0 +1,58 @@
+import contextlib
+import io
+import json
+import sys
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BASE_DIR)
+
+from batch_renderer import plan_batch, render_batch
+from utils import instrumentation
+
+SEEDS = ["1", "2", "3", "4"]
+
+
+def _run_instrumented(fn):
+    """Run fn() with metrics on and a trace hook; returns (snapshot, trace events)."""
+    trace = io.StringIO()
+    hook = instrumentation.JsonLogHook(trace)
+    instrumentation.reset()
+    instrumentation.enable()
+    instrumentation.add_hook(hook)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            fn()
+    finally:
+        instrumentation.remove_hook(hook)
+        instrumentation.disable()
+    data = instrumentation.snapshot()
+    instrumentation.reset()
+    return data, [json.loads(line) for line in trace.getvalue().splitlines()]
+
+
+def test_render_batch_workers_report_metrics():
+    with tempfile.TemporaryDirectory() as output_dir:
+        data, events = _run_instrumented(lambda: render_batch(SEEDS, workers=2, output_dir=output_dir))
+    spans = {entry["span"]: entry for entry in data["spans"]}
+    assert spans["midi_write"]["calls"] == len(SEEDS)
+    assert data["counters"], "no counters from the workers"
+    assert len(events) == sum(entry["calls"] for entry in data["spans"])
+
+
+def test_plan_batch_workers_report_metrics():
+    data, events = _run_instrumented(lambda: plan_batch([str(s) for s in range(1, 101)], io.StringIO(),
+                                                        workers=2, chunk_size=25))
+    generated = {entry["counter"]: entry["value"] for entry in data["counters"]}
+    assert generated["generated_progressions"] > 0
+    assert len(events) == sum(entry["calls"] for entry in data["spans"])
+
+
+if __name__ == "__main__":
+    test_render_batch_workers_report_metrics()
+    test_plan_batch_workers_report_metrics()
+    print("OK: batch metrics merged")
@@ -1,7 +1,5 @@
-import random
 import sys
 import os
-from music21 import note
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
@@ -11,26 +9,13 @@ from utils.drum_fill import DrumFill
 
 class DrumGenerator:
     @staticmethod
-    def generate_standard_beat():
-        notes = []
-        for i in range(4):
-            k = note.Note(36)
-            k.quarterLength = 1.0
-            k.volume.velocity = random.randint(90, 110)
-            
-            if i in [1, 3]:
-                s = note.Note(38)
-                s.quarterLength = 1.0
-                s.volume.velocity = random.randint(85, 105)
-                notes.append(s)
-            else:
-                notes.append(k)
-        return notes
+    def generate_standard_beat(rng=None, mood=None):
+        return DrumFill.generate_standard_beat(rng, mood)
 
     @staticmethod
-    def generate_fill():
-        return DrumFill.generate_transition_fill()
+    def generate_fill(rng=None, mood=None):
+        return DrumFill.generate_transition_fill(rng, mood)
 
     @staticmethod
-    def generate_final_hit():
-        return DrumFill.generate_final_hit()
+    def generate_final_hit(rng=None, mood=None):
+        return DrumFill.generate_final_hit(rng, mood)
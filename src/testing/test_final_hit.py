@@ -0,0 +1,39 @@
+import contextlib
+import io
+import sys
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BASE_DIR)
+
+from composer import compose_song, prepare_song
+from utils.drum_patterns import DRUM_KIT
+
+SEEDS = ["1", "42", "99", "123456"]
+
+
+def test_only_the_last_section_is_marked_last():
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, sections = prepare_song("42")
+    assert [last for _, _, _, last in sections] == [False] * (len(sections) - 1) + [True]
+
+
+def test_song_ends_on_the_final_hit():
+    crash = DRUM_KIT["crash"][0]
+    for seed in SEEDS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            parts, _ = compose_song(seed)
+        drum = parts["drum"]
+        last_bar = drum.duration - 4.0
+        crashes = [ev for ev in drum.events if ev.pitch == crash and ev.offset == last_bar]
+        assert crashes, f"seed {seed}: no crash on the last bar"
+        assert drum.duration == parts["chord"].duration, f"seed {seed}: drums end off the song's last bar"
+
+
+if __name__ == "__main__":
+    test_only_the_last_section_is_marked_last()
+    test_song_ends_on_the_final_hit()
+    print("OK: final hit present")
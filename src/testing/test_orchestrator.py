@@ -1,38 +1,49 @@
 import os
-import time
 import subprocess
-import random
-
-def run_session():
-    result_dir = "result"
-    
-    if not os.path.exists(result_dir):
-        os.makedirs(result_dir)
-    
-    while True:
-        seed = random.randint(100000, 999999)
-        print(f"\n[SESSION] Starting new composition with seed: {seed}")
-        
-        cmd = ["python", "src/testing/test_composition.py", "--seed", str(seed)]
-        subprocess.run(cmd)
-        
-        files = [f for f in os.listdir(result_dir) if f.endswith(".mid") and str(seed) in f]
-        
-        if files:
-            midi_path = os.path.join(result_dir, files[0])
-            
+import argparse
+
+from render_daemon import RenderDaemon
+from render_queue import LookaheadQueue
+from utils.overlay_manager import OverlayManager
+from utils.render_cache import RenderCache
+
+def run_session(lookahead=3, render_cache=None):
+    overlay = OverlayManager()
+
+    with RenderDaemon(render_cache=render_cache) as daemon, LookaheadQueue(daemon, depth=lookahead) as tracks:
+        while True:
+            seed, midi_path, song_info = tracks.get()
+            print(f"\n[SESSION] Starting new composition with seed: {seed}")
+
+            overlay.update_metadata(song_info)
+
             print(f"[PLAYBACK] Playing: {midi_path}")
             play_cmd = ["timidity", "-ia", midi_path]
             subprocess.run(play_cmd)
-            
+
+            # Cached renders are linked into result/, so removing the copy keeps the cache entry
             try:
                 os.remove(midi_path)
                 print(f"[CLEANUP] Removed: {midi_path}")
             except Exception as e:
                 print(f"[ERROR] Cleanup failed: {e}")
-        
-        print("[SESSION] Waiting for next track...")
-        time.sleep(2)
+
+            stats = tracks.snapshot()
+            print(
+                f"[QUEUE] {stats['queued']}/{stats['depth']} ready, "
+                f"underruns: {stats['underruns']} ({stats['underrun_wait']:.2f}s), "
+                f"render errors: {stats['render_errors']}"
+            )
 
 if __name__ == "__main__":
-    run_session()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookahead", type=int, default=3, help="Number of tracks to pre-render")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Reuse renders from this on-disk cache")
+    parser.add_argument("--cache-max-mb", type=float, default=500, help="Evict cached renders beyond this size")
+    args = parser.parse_args()
+
+    render_cache = None
+    if args.cache_dir:
+        render_cache = RenderCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+    run_session(args.lookahead, render_cache)
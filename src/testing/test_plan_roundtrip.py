@@ -0,0 +1,52 @@
+import contextlib
+import filecmp
+import io
+import subprocess
+import sys
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BASE_DIR)
+
+from composer import OUTPUT_DIR, render_song, song_filename
+
+SCRIPT = os.path.join(BASE_DIR, "test-composition.py")
+SEEDS = "1-3"
+
+
+def test_plan_only_pipes_into_from_plans():
+    planner = subprocess.Popen([sys.executable, SCRIPT, "--plan-only", "--seeds", SEEDS, "--workers", "1"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    renderer = subprocess.run([sys.executable, SCRIPT, "--from-plans", "/dev/stdin"],
+                              stdin=planner.stdout, capture_output=True)
+    planner.stdout.close()
+    assert planner.wait() == 0
+    assert renderer.returncode == 0, renderer.stderr.decode()
+    assert "SUCCESS: Rendered 3 planned songs" in renderer.stdout.decode()
+
+    with tempfile.TemporaryDirectory() as direct_dir, contextlib.redirect_stdout(io.StringIO()):
+        for seed in ("1", "2", "3"):
+            direct_file, song_info = render_song(seed, output_dir=direct_dir)
+            planned_file = os.path.join(OUTPUT_DIR, song_filename(song_info))
+            assert filecmp.cmp(direct_file, planned_file, shallow=False), f"seed {seed}: planned render differs"
+
+
+def test_from_plans_reports_the_bad_line():
+    with tempfile.NamedTemporaryFile('w', suffix=".jsonl", delete=False) as f:
+        f.write('{"seed":"1","key":"C","scale":"major","mood":"chill","bpm":80,"structure":"short_radio"}\n\nnot json\n')
+    try:
+        result = subprocess.run([sys.executable, SCRIPT, "--from-plans", f.name], capture_output=True)
+    finally:
+        os.remove(f.name)
+    assert result.returncode == 2
+    assert f"{f.name}:3: invalid plan" in result.stderr.decode()
+
+
+if __name__ == "__main__":
+    test_plan_only_pipes_into_from_plans()
+    test_from_plans_reports_the_bad_line()
+    print("OK: plans round-trip")
@@ -1,10 +1,6 @@
-import json
-import random
 import sys
 import os
-import time
 import argparse
-from music21 import stream, metadata, tempo, instrument
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
@@ -17,115 +13,79 @@ from utils.instrument_manager import InstrumentManager
 from test_bass import BassGenerator
 from test_drum import DrumGenerator
 from structure_manager import StructureManager 
-
-def load_notes():
-    with open(os.path.join(PROJECT_ROOT, 'data', 'note', 'note.json'), 'r') as file:
-        return json.load(file)
-
-def load_templates(filename="song_progresion.json"):
-    template_path = os.path.join(PROJECT_ROOT, 'data', 'templates', filename)
-    try:
-        if os.path.exists(template_path):
-            with open(template_path, 'r') as file:
-                return json.load(file)
-        return None
-    except Exception as e:
-        print(f"Warning: {e}")
-        return None
-
-def load_atmosphere(mood="chill"):
-    path = os.path.join(PROJECT_ROOT, 'data', 'templates', 'atmosphere.json')
-    try:
-        with open(path, 'r') as f:
-            data = json.load(f)
-        return data.get(mood, data["chill"])
-    except:
-        return {"bpm_range": [80, 100], "velocity_range": [60, 80]}
+from composer import TEMPLATE_FILES, load_atmosphere, load_notes, load_templates, resolve_seed, write_song_midi
+from utils.rng import SeedStream
+from utils.events import EventPart, LANE_CHANNELS
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--seed", type=str, default=None)
     args = parser.parse_args()
 
-    if args.seed:
-        random.seed(args.seed)
-        print(f"--- Seed Locked: {args.seed} ---")
+    # Same stream layout as composer.prepare_song: one "song" stream, one per section
+    seed = resolve_seed(args.seed)
+    root_rng = SeedStream(seed)
+    rng = root_rng.spawn("song")
+    print(f"--- Seed Locked: {seed} ---")
 
     try:
         notes_data = load_notes()
-        root_key = random.choice(list(notes_data.keys()))
-        is_minor = random.choice([True, False])
+        root_key = rng.choice(list(notes_data.keys()))
+        is_minor = rng.choice([True, False])
         scale_type = 'minor' if is_minor else 'major'
         category = scale_type
         
         moods = ["chill", "energetic"]
-        selected_mood = random.choice(moods)
+        selected_mood = rng.choice(moods)
         mood_config = load_atmosphere(selected_mood)
-        target_bpm = random.randint(mood_config["bpm_range"][0], mood_config["bpm_range"][1])
+        target_bpm = rng.randint(mood_config["bpm_range"][0], mood_config["bpm_range"][1])
 
         print(f"--- Composition: {root_key} {scale_type.capitalize()} ({selected_mood.upper()}) ---")
         print(f"--- Tempo: {target_bpm} BPM ---")
 
-        song = stream.Score()
-        song.metadata = metadata.Metadata(title=f"Procedural {root_key} {args.seed}")
-        
-        full_chord = stream.Part()
-        full_melody = stream.Part()
-        full_bass = stream.Part()
-        full_drum = stream.Part()
-
-        full_chord.append(instrument.Piano())
-        full_chord.append(tempo.MetronomeMark(number=target_bpm))
-        full_melody.append(instrument.AcousticGuitar())
-        full_bass.append(instrument.ElectricBass())
-        full_drum.append(instrument.Percussion())
+        full_chord = EventPart(LANE_CHANNELS["chord"])
+        full_melody = EventPart(LANE_CHANNELS["melody"])
+        full_bass = EventPart(LANE_CHANNELS["bass"])
+        full_drum = EventPart(LANE_CHANNELS["drum"])
 
         song_flow = ["intro", "verse", "chorus", "verse", "chorus", "bridge", "chorus", "outro"]
         
-        template_files = {
-            "intro": "intro_progresion.json",
-            "verse": "verse.json",
-            "chorus": "chorus_progresion.json",
-            "bridge": "bridge_progresion.json",
-            "outro": "outro_progresion.json"
-        }
-
-        for section in song_flow:
-            filename = template_files.get(section, "song_progresion.json")
+        for index, section in enumerate(song_flow):
+            section_rng = root_rng.spawn("section", index, section)
+            prog_rng = section_rng.spawn("progression")
+            filename = TEMPLATE_FILES.get(section, "song_progresion.json")
             templates = load_templates(filename)
             
             prog = None
             if templates:
                 if section in templates and category in templates[section]:
-                    prog = random.choice(templates[section][category])
+                    prog = prog_rng.choice(templates[section][category])
                 elif category in templates:
-                    prog = random.choice(templates[category])
+                    prog = prog_rng.choice(templates[category])
 
             if not prog:
-                prog = MusicTheory.generate_random_progression(length=4, key=root_key, is_minor=is_minor)
+                prog = MusicTheory.generate_random_progression(length=4, key=root_key, is_minor=is_minor, rng=prog_rng)
             
             c_p, m_p, b_p, d_p = StructureManager.create_section(
                 section, prog, root_key, scale_type, MusicTheory, 
-                BassGenerator, DrumGenerator, InstrumentManager, selected_mood
+                BassGenerator, DrumGenerator, InstrumentManager, selected_mood,
+                is_last_section=(index == len(song_flow) - 1), rng=section_rng
             )
             
-            for n in c_p: full_chord.append(n)
-            for n in m_p: full_melody.append(n)
-            for n in b_p: full_bass.append(n)
-            for n in d_p: full_drum.append(n)
+            full_chord.extend(c_p)
+            full_melody.extend(m_p)
+            full_bass.extend(b_p)
+            full_drum.extend(d_p)
 
-        song.insert(0, full_chord)
-        song.insert(0, full_melody)
-        song.insert(0, full_bass)
-        song.insert(0, full_drum)
+        parts = {"chord": full_chord, "melody": full_melody, "bass": full_bass, "drum": full_drum}
         
         OUTPUT_DIR = os.path.join(PROJECT_ROOT, "result")
         if not os.path.exists(OUTPUT_DIR): os.makedirs(OUTPUT_DIR)
 
-        filename = f"{root_key}_{scale_type.capitalize()}_{args.seed if args.seed else 'random'}.mid"
+        filename = f"{root_key}_{scale_type.capitalize()}_{seed}.mid"
         output_file = os.path.join(OUTPUT_DIR, filename)
         
-        song.write('midi', fp=output_file)
+        write_song_midi(parts, {"bpm": target_bpm}, output_file)
         print(f"SUCCESS: Saved to {output_file}")
 
     except Exception as e:
@@ -0,0 +1,279 @@
+"""
+Audio Render
+Offline MIDI -> WAV rendering on a bounded pool of worker processes.
+Backends are pluggable: TimidityBackend shells out to timidity, and
+SineSynthBackend is a small pure-Python synth for machines without one.
+Rendered audio can be read back in fixed-size PCM chunks for a
+streaming encoder.
+"""
+
+import math
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class AudioRenderError(RuntimeError):
+    pass
+
+
+class AudioRenderTimeout(AudioRenderError):
+    pass
+
+
+class TimidityBackend:
+    """Renders with the timidity command line player (`-Ow` WAV output)."""
+
+    name = "timidity"
+
+    def __init__(self, executable: str = "timidity", sample_rate: int = 44100, extra_args: Iterable[str] = ()):
+        self.executable = executable
+        self.sample_rate = sample_rate
+        self.extra_args = list(extra_args)
+
+    def render(self, midi_path: str, wav_path: str, timeout: Optional[float] = None) -> str:
+        cmd = [self.executable, "-Ow", "-s", str(self.sample_rate), "-o", wav_path] + self.extra_args + [midi_path]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise AudioRenderTimeout(f"{self.name} timed out after {timeout}s: {midi_path}")
+        except FileNotFoundError:
+            raise AudioRenderError(f"{self.executable} not found")
+        if result.returncode != 0 or not os.path.exists(wav_path):
+            raise AudioRenderError(f"{self.name} failed ({result.returncode}): {result.stderr.decode(errors='replace').strip()}")
+        return wav_path
+
+
+def _read_varlen(data: bytes, pos: int) -> Tuple[int, int]:
+    """(value, position after it) for an SMF variable-length quantity at `pos`."""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_midi_notes(path: str) -> List[Tuple[float, float, int, int, int]]:
+    """
+    Notes of a Standard MIDI File as (start_s, end_s, pitch, velocity, channel),
+    following the file's tempo changes. Unterminated notes are dropped.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'MThd':
+        raise AudioRenderError(f"Not a MIDI file: {path}")
+    header_len = struct.unpack('>I', data[4:8])[0]
+    _, track_count, division = struct.unpack('>HHH', data[8:14])
+    if division & 0x8000:
+        raise AudioRenderError("SMPTE time division is not supported")
+
+    tempos = [(0, 500000)]  # (tick, microseconds per quarter)
+    raw = []  # (tick, is_on, pitch, velocity, channel)
+    pos = 8 + header_len
+    for _ in range(track_count):
+        if data[pos:pos + 4] != b'MTrk':
+            break
+        length = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        pos += 8
+        end = len(data) if length == 0xFFFFFFFF else min(len(data), pos + length)
+        tick, status = 0, 0
+        while pos < end:
+            delta, pos = _read_varlen(data, pos)
+            tick += delta
+            if data[pos] & 0x80:
+                status = data[pos]
+                pos += 1
+            if status == 0xFF:
+                meta_type = data[pos]
+                meta_len, pos = _read_varlen(data, pos + 1)
+                if meta_type == 0x51:
+                    tempos.append((tick, int.from_bytes(data[pos:pos + 3], 'big')))
+                pos += meta_len
+                if meta_type == 0x2F:
+                    break
+            elif status in (0xF0, 0xF7):
+                sysex_len, pos = _read_varlen(data, pos)
+                pos += sysex_len
+            else:
+                kind = status & 0xF0
+                if kind in (0xC0, 0xD0):
+                    pos += 1
+                    continue
+                a, b = data[pos], data[pos + 1]
+                pos += 2
+                if kind == 0x90 and b > 0:
+                    raw.append((tick, 1, a, b, status & 0x0F))
+                elif kind == 0x80 or kind == 0x90:
+                    raw.append((tick, 0, a, 0, status & 0x0F))
+        pos = end
+
+    tempos.sort()
+
+    def seconds(t):
+        elapsed, last_tick, mspq = 0.0, 0, 500000
+        for tempo_tick, tempo in tempos:
+            if tempo_tick > t:
+                break
+            elapsed += (tempo_tick - last_tick) * mspq / 1e6 / division
+            last_tick, mspq = tempo_tick, tempo
+        return elapsed + (t - last_tick) * mspq / 1e6 / division
+
+    notes = []
+    sounding: Dict[Tuple[int, int], deque] = {}
+    for tick, is_on, pitch, velocity, channel in sorted(raw, key=lambda m: (m[0], m[1])):
+        if is_on:
+            sounding.setdefault((channel, pitch), deque()).append((tick, velocity))
+        elif sounding.get((channel, pitch)):
+            start, vel = sounding[(channel, pitch)].popleft()
+            notes.append((seconds(start), seconds(tick), pitch, vel, channel))
+    notes.sort()
+    return notes
+
+
+class SineSynthBackend:
+    """
+    Minimal pure-Python synth: decaying sine tones for pitched channels and
+    short noise bursts for percussion (channel 10), mono 16-bit WAV.
+    Meant for tests and machines without a soundfont player, not for quality.
+    """
+
+    name = "synth"
+
+    def __init__(self, sample_rate: int = 22050, gain: float = 0.25, release: float = 0.05):
+        self.sample_rate = sample_rate
+        self.gain = gain
+        self.release = release
+
+    def render(self, midi_path: str, wav_path: str, timeout: Optional[float] = None) -> str:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        rate = self.sample_rate
+        notes = read_midi_notes(midi_path)
+        total = int((max((end for _, end, _, _, _ in notes), default=0.0) + self.release) * rate) + 1
+        mix = array('f', bytes(4 * total))
+
+        noise = 0x1234
+        for start_s, end_s, pitch, velocity, channel in notes:
+            if deadline is not None and time.monotonic() > deadline:
+                raise AudioRenderTimeout(f"{self.name} timed out after {timeout}s: {midi_path}")
+            start = int(start_s * rate)
+            amp = self.gain * velocity / 127.0
+            if channel == 9:
+                length = min(int(0.08 * rate), total - start)
+                for i in range(length):
+                    noise = (noise * 1103515245 + 12345) & 0x7FFFFFFF
+                    mix[start + i] += amp * (noise / 0x3FFFFFFF - 1.0) * (1.0 - i / length)
+                continue
+            length = min(int((end_s - start_s + self.release) * rate), total - start)
+            step = 2.0 * math.pi * 440.0 * 2.0 ** ((pitch - 69) / 12.0) / rate
+            decay = math.exp(-3.0 / rate)
+            env = amp
+            for i in range(length):
+                mix[start + i] += env * math.sin(step * i)
+                env *= decay
+
+        pcm = array('h', (max(-32767, min(32767, int(s * 32767))) for s in mix))
+        if sys.byteorder == 'big':
+            pcm.byteswap()
+        with wave.open(wav_path, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes(pcm.tobytes())
+        return wav_path
+
+
+BACKENDS = {
+    TimidityBackend.name: TimidityBackend,
+    SineSynthBackend.name: SineSynthBackend,
+}
+
+
+def get_backend(name: str, **options):
+    try:
+        return BACKENDS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown audio backend: {name} (available: {', '.join(sorted(BACKENDS))})")
+
+
+def iter_pcm_chunks(wav_path: str, chunk_frames: int = 4096) -> Iterator[bytes]:
+    """Read a WAV file's PCM frames in fixed-size chunks, e.g. to feed an encoder."""
+    with wave.open(wav_path, 'rb') as wav:
+        while True:
+            chunk = wav.readframes(chunk_frames)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _render_job(backend, midi_path: str, wav_path: str, timeout: Optional[float]) -> Dict:
+    started = time.perf_counter()
+    try:
+        backend.render(midi_path, wav_path, timeout)
+        return {"midi": midi_path, "wav": wav_path, "seconds": time.perf_counter() - started}
+    except Exception as e:
+        try:
+            os.remove(wav_path)
+        except OSError:
+            pass
+        return {"midi": midi_path, "error": str(e), "timeout": isinstance(e, AudioRenderTimeout)}
+
+
+class AudioRenderPool:
+    """
+    Renders MIDI files to WAV on `workers` processes. At most `max_pending`
+    jobs are queued or running; submit() blocks beyond that, so a fast
+    producer (the composer) is held back instead of piling up work.
+    Each job is limited to `timeout` seconds by its backend.
+    """
+
+    def __init__(self, backend, workers: int = 2, timeout: Optional[float] = 120.0, max_pending: Optional[int] = None):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def submit(self, midi_path: str, wav_path: Optional[str] = None):
+        """Queue a render; the future resolves to a result dict ("wav" on success, "error" otherwise)."""
+        wav_path = wav_path or os.path.splitext(midi_path)[0] + ".wav"
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(_render_job, self.backend, midi_path, wav_path, self.timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def map(self, midi_paths: Iterable[str], output_dir: Optional[str] = None) -> Iterator[Dict]:
+        """Render many files, yielding results in input order while later ones run."""
+        pending = deque()
+        for midi_path in midi_paths:
+            wav_path = None
+            if output_dir:
+                wav_path = os.path.join(output_dir, os.path.splitext(os.path.basename(midi_path))[0] + ".wav")
+            # Yield finished results before blocking on a free slot
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+            pending.append(self.submit(midi_path, wav_path))
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
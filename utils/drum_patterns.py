@@ -0,0 +1,167 @@
+"""
+Drum Patterns
+Step-sequencer drum patterns loaded from data/templates/drum_patterns.json
+and compiled once into flat arrays, so rendering a bar is a single pass
+over precomputed hits instead of per-step branching.
+
+Pattern lanes are strings with one character per step:
+'.' rest, 'x' hit, 'X' accent, 'g' ghost note.
+"""
+
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from utils.events import NoteEvent
+from utils.rng import resolve
+from utils.template_registry import get_registry
+
+BAR_LENGTH = 4.0
+
+# GM percussion notes per lane; lanes with several notes pick one per hit
+DRUM_KIT = {
+    "kick": (36,),
+    "snare": (38,),
+    "hat": (42,),
+    "open_hat": (46,),
+    "ride": (51,),
+    "tom": (38, 40, 41),
+    "crash": (49,),
+}
+
+DEFAULT_VELOCITY = {
+    "kick": (90, 110),
+    "snare": (85, 105),
+    "hat": (55, 75),
+    "open_hat": (60, 80),
+    "ride": (55, 70),
+    "tom": (95, 115),
+    "crash": (110, 120),
+}
+
+ACCENT = 15
+GHOST_VELOCITY = (35, 50)
+
+# Used when drum_patterns.json is missing or invalid: the original hard-coded grooves
+DEFAULT_PATTERNS = {
+    "patterns": {
+        "backbeat": {"role": "beat", "resolution": 4, "lanes": {"kick": "x.x.", "snare": ".x.x"}},
+        "transition": {"role": "fill", "resolution": 16,
+                       "lanes": {"kick": "x...x...x.......", "tom": "............xxxx"}},
+        "final_crash": {"role": "final", "resolution": 1, "note_length": 4.0, "lanes": {"kick": "X", "crash": "X"}},
+    }
+}
+
+
+class CompiledPattern:
+    """
+    One pattern as parallel tuples, one entry per hit in time order:
+    offset (quarter lengths, swing applied), pitch choices, velocity
+    range (low, number of values). Hits sounding at the same step keep lane order.
+    """
+
+    __slots__ = ('name', 'role', 'moods', 'weight', 'note_length', 'humanize',
+                 'offsets', 'pitches', 'velocity_low', 'velocity_span')
+
+    def __init__(self, name: str, spec: Dict, velocity: Dict[str, Tuple[int, int]]):
+        self.name = name
+        self.role = spec["role"]
+        self.moods = tuple(spec.get("moods", ()))
+        self.weight = spec.get("weight", 1)
+        self.humanize = spec.get("humanize", 0.0)
+
+        resolution = spec["resolution"]
+        step = BAR_LENGTH / resolution
+        swing = spec.get("swing", 0.0)
+        self.note_length = spec.get("note_length", step)
+
+        hits = []
+        for lane_index, (lane, steps) in enumerate(spec["lanes"].items()):
+            if lane not in DRUM_KIT:
+                print(f"Warning: drum pattern {name} uses unknown lane '{lane}'", file=sys.stderr)
+                continue
+            low, high = velocity.get(lane, (80, 100))
+            for index, mark in enumerate(steps):
+                if mark == '.':
+                    continue
+                if mark == 'X':
+                    bounds = (min(127, low + ACCENT), min(127, high + ACCENT))
+                elif mark == 'g':
+                    bounds = GHOST_VELOCITY
+                else:
+                    bounds = (low, high)
+                offset = index * step + (swing * step if index % 2 else 0.0)
+                hits.append((index, lane_index, offset, DRUM_KIT[lane], bounds))
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+
+        self.offsets = tuple(hit[2] for hit in hits)
+        self.pitches = tuple(hit[3] for hit in hits)
+        self.velocity_low = tuple(hit[4][0] for hit in hits)
+        self.velocity_span = tuple(hit[4][1] - hit[4][0] + 1 for hit in hits)
+
+    def render(self, rng=None, velocity_scale: float = 1.0) -> List[NoteEvent]:
+        """One bar of events, with velocities and optional timing drawn from `rng` in one pass."""
+        rng = resolve(rng)
+        random = rng.random
+        length = self.note_length
+        humanize = self.humanize
+        events = []
+        for offset, pitches, low, span in zip(self.offsets, self.pitches, self.velocity_low, self.velocity_span):
+            pitch = pitches[0] if len(pitches) == 1 else pitches[int(random() * len(pitches))]
+            velocity = low + int(random() * span)
+            if velocity_scale != 1.0:
+                velocity = int(velocity * velocity_scale)
+            if humanize:
+                offset = max(0.0, offset + rng.uniform(-humanize, humanize))
+            events.append(NoteEvent(offset, length, pitch, velocity))
+        return events
+
+
+class DrumPatternEngine:
+    """Compiled patterns grouped by role and mood."""
+
+    def __init__(self, data: Dict):
+        velocity = dict(DEFAULT_VELOCITY)
+        velocity.update({lane: tuple(bounds) for lane, bounds in data.get("velocity", {}).items()})
+        self.patterns = {name: CompiledPattern(name, spec, velocity) for name, spec in data["patterns"].items()}
+        self._choices: Dict[Tuple[str, Optional[str]], Tuple[tuple, tuple]] = {}
+
+    def candidates(self, role: str, mood: Optional[str] = None) -> Tuple[tuple, tuple]:
+        """(patterns, weights) for a role; mood-specific patterns plus ones without a mood."""
+        key = (role, mood)
+        found = self._choices.get(key)
+        if found is None:
+            matches = [p for p in self.patterns.values()
+                       if p.role == role and (not p.moods or mood is None or mood in p.moods)]
+            found = (tuple(matches), tuple(p.weight for p in matches))
+            self._choices[key] = found
+        return found
+
+    def choose(self, role: str, mood: Optional[str] = None, rng=None) -> Optional[CompiledPattern]:
+        patterns, weights = self.candidates(role, mood)
+        if not patterns:
+            return None
+        if len(patterns) == 1:
+            return patterns[0]
+        return resolve(rng).choices(patterns, weights)[0]
+
+    def render(self, role: str, mood: Optional[str] = None, rng=None, velocity_scale: float = 1.0) -> List[NoteEvent]:
+        """Pick a pattern for the role and mood and render one bar of it."""
+        rng = resolve(rng)
+        pattern = self.choose(role, mood, rng)
+        if pattern is None:
+            return []
+        return pattern.render(rng, velocity_scale)
+
+
+_cached: Tuple = (None, None)  # (pattern data, engine compiled from it)
+
+
+def get_engine() -> DrumPatternEngine:
+    """Engine for the current drum_patterns.json, recompiled only when the file changes."""
+    global _cached
+    data = get_registry().get('drum_patterns.json') or DEFAULT_PATTERNS
+    cached_data, engine = _cached
+    if engine is None or cached_data is not data:
+        engine = DrumPatternEngine(data)
+        _cached = (data, engine)
+    return engine
@@ -0,0 +1,142 @@
+"""
+Note Events
+Compact event model used by the generators instead of music21 objects.
+Events are only converted to music21 when a caller asks for it.
+"""
+
+from typing import Iterable, List
+
+# MIDI channels used for each instrument lane (drums on GM channel 10)
+LANE_CHANNELS = {
+    'chord': 0,
+    'melody': 1,
+    'bass': 2,
+    'drum': 9,
+}
+
+
+class NoteEvent:
+    """A single note: offset and duration in quarter lengths, MIDI pitch and velocity"""
+
+    __slots__ = ('offset', 'duration', 'pitch', 'velocity', 'channel')
+
+    def __init__(self, offset: float, duration: float, pitch: int, velocity: int, channel: int = 0):
+        self.offset = offset
+        self.duration = duration
+        self.pitch = pitch
+        self.velocity = velocity
+        self.channel = channel
+
+    def __repr__(self):
+        return (f"NoteEvent(offset={self.offset}, duration={self.duration}, pitch={self.pitch}, "
+                f"velocity={self.velocity}, channel={self.channel})")
+
+    def __eq__(self, other):
+        if not isinstance(other, NoteEvent):
+            return NotImplemented
+        return (self.offset, self.duration, self.pitch, self.velocity, self.channel) == \
+            (other.offset, other.duration, other.pitch, other.velocity, other.channel)
+
+    def to_music21(self):
+        from music21 import note
+        n = note.Note(self.pitch)
+        n.quarterLength = self.duration
+        n.volume.velocity = self.velocity
+        return n
+
+
+def sequence(notes: Iterable[tuple], channel: int = 0) -> List[NoteEvent]:
+    """
+    Lay out (duration, pitch, velocity) tuples back to back, the way
+    stream.append() would. A tuple pitch is a chord sounding at one offset.
+    """
+    events = []
+    offset = 0.0
+    for duration, pitch, velocity in notes:
+        if isinstance(pitch, tuple):
+            for p in pitch:
+                events.append(NoteEvent(offset, duration, p, velocity, channel))
+        else:
+            events.append(NoteEvent(offset, duration, pitch, velocity, channel))
+        offset += duration
+    return events
+
+
+class EventPart:
+    """
+    Ordered event list for one instrument lane; stands in for stream.Part.
+    `duration` is the append cursor, like a Part's highest time.
+    """
+
+    __slots__ = ('events', 'channel', 'duration')
+
+    def __init__(self, channel: int = 0):
+        self.events: List[NoteEvent] = []
+        self.channel = channel
+        self.duration = 0.0
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def append(self, duration: float, pitch, velocity: int) -> None:
+        """Append a note (int pitch) or chord (tuple of pitches) at the cursor."""
+        pitches = pitch if isinstance(pitch, tuple) else (pitch,)
+        for p in pitches:
+            self.events.append(NoteEvent(self.duration, duration, p, velocity, self.channel))
+        self.duration += duration
+
+    def append_events(self, events: Iterable[NoteEvent]) -> None:
+        """Append a fragment whose offsets start at 0, shifting it to the cursor."""
+        start = self.duration
+        end = start
+        for ev in events:
+            ev.offset += start
+            ev.channel = self.channel
+            self.events.append(ev)
+            end = max(end, ev.offset + ev.duration)
+        self.duration = end
+
+    def advance_to(self, position: float) -> None:
+        """Move the cursor forward to `position` (a rest); never moves it back."""
+        if position > self.duration:
+            self.duration = position
+
+    def extend(self, other: 'EventPart') -> None:
+        """Append another part's events after this part's cursor."""
+        start = self.duration
+        for ev in other.events:
+            self.events.append(NoteEvent(ev.offset + start, ev.duration, ev.pitch, ev.velocity, self.channel))
+        self.duration = start + other.duration
+
+    def to_music21(self, part=None):
+        """
+        Convert to a music21 Part (or fill `part`). Consecutive events sharing
+        offset, duration and velocity become a single Chord.
+        """
+        from music21 import stream, chord, note
+
+        if part is None:
+            part = stream.Part()
+
+        events = self.events
+        i = 0
+        count = len(events)
+        while i < count:
+            ev = events[i]
+            j = i + 1
+            while (j < count and events[j].offset == ev.offset
+                   and events[j].duration == ev.duration and events[j].velocity == ev.velocity):
+                j += 1
+
+            if j - i > 1:
+                obj = chord.Chord([e.pitch for e in events[i:j]])
+            else:
+                obj = note.Note(ev.pitch)
+            obj.quarterLength = ev.duration
+            obj.volume.velocity = ev.velocity
+            part.insert(ev.offset, obj)
+            i = j
+        return part
@@ -1,25 +1,103 @@
-import json
-import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.template_registry import get_registry
+
+# Bit for each instrument lane in an arrangement mask
+LANE_BITS = {
+    "chord": 1,
+    "melody": 2,
+    "bass": 4,
+    "drum": 8,
+}
+
+# Used when data/templates/instrument_config.json is missing or invalid
+DEFAULT_ARRANGEMENT = {
+    "default": {
+        "intro": ["chord"],
+        "verse": ["chord", "bass"],
+        "chorus": ["chord", "melody", "bass", "drum"],
+        "bridge": ["chord", "melody"],
+        "outro": ["chord", "bass"]
+    },
+    "energetic": {
+        "verse": ["chord", "bass", "drum"]
+    }
+}
+
+FALLBACK_INSTRUMENTS = ["chord"]
+
+
+def lane_mask(instruments: Iterable[str]) -> int:
+    mask = 0
+    for name in instruments:
+        mask |= LANE_BITS.get(name, 0)
+    return mask
+
+
+class ArrangementMatrix:
+    """
+    (section, mood) -> per-bar bitmasks of active lanes, resolved once from
+    an instrument config. The "default" profile applies to every mood;
+    a profile named after a mood overrides individual sections. A section
+    is a list of instruments for every bar, or a list of per-bar lists
+    that repeats over the section.
+    """
+
+    def __init__(self, config: Dict):
+        self.profiles = {
+            profile: {section: self._bar_masks(instruments) for section, instruments in sections.items()}
+            for profile, sections in config.items()
+        }
+        self._default = self.profiles.get("default", {})
+        self._fallback = (lane_mask(FALLBACK_INSTRUMENTS),)
+        self._resolved: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+
+    @staticmethod
+    def _bar_masks(instruments) -> Tuple[int, ...]:
+        if instruments and all(isinstance(bar, list) for bar in instruments):
+            return tuple(lane_mask(bar) for bar in instruments)
+        return (lane_mask(instruments),)
+
+    def bar_masks(self, section_type: str, mood: str = "chill") -> Tuple[int, ...]:
+        """Masks for consecutive bars of a section; bar i uses masks[i % len(masks)]."""
+        key = (section_type, mood)
+        masks = self._resolved.get(key)
+        if masks is None:
+            profile = self.profiles.get(mood, {})
+            masks = profile.get(section_type) or self._default.get(section_type) or self._fallback
+            self._resolved[key] = masks
+        return masks
+
+    def mask(self, section_type: str, mood: str = "chill", bar: int = 0) -> int:
+        masks = self.bar_masks(section_type, mood)
+        return masks[bar % len(masks)]
+
+    def plays(self, lane: str, section_type: str, mood: str = "chill", bar: Optional[int] = None) -> bool:
+        """Whether a lane plays in a given bar, or in any bar of the section when bar is None."""
+        bit = LANE_BITS.get(lane, 0)
+        if bar is None:
+            return any(m & bit for m in self.bar_masks(section_type, mood))
+        return bool(self.mask(section_type, mood, bar) & bit)
+
 
 class InstrumentManager:
+    _cached: Tuple = (None, None)  # (config, matrix built from it)
+
     @staticmethod
-    def get_active_instruments(section_type, mood="chill"):
-        
-        configs = {
-            "intro": ["chord"],
-            "verse": ["chord", "bass"],
-            "chorus": ["chord", "melody", "bass", "drum"],
-            "bridge": ["chord", "melody"],
-            "outro": ["chord", "bass"]
-        }
-        
-        active = configs.get(section_type, ["chord"])
-        
-        if mood == "energetic" and section_type == "verse":
-            active.append("drum") 
-        return active
+    def arrangement() -> ArrangementMatrix:
+        """Arrangement matrix for the current instrument_config.json, rebuilt only when it changes."""
+        config = get_registry().get('instrument_config.json') or DEFAULT_ARRANGEMENT
+        cached_config, matrix = InstrumentManager._cached
+        if matrix is None or cached_config is not config:
+            matrix = ArrangementMatrix(config)
+            InstrumentManager._cached = (config, matrix)
+        return matrix
+
+    @staticmethod
+    def get_active_instruments(section_type, mood="chill") -> List[str]:
+        mask = InstrumentManager.arrangement().mask(section_type, mood)
+        return [lane for lane, bit in LANE_BITS.items() if mask & bit]
 
     @staticmethod
-    def should_play(instrument_name, section_type, mood="chill"):
-        active_list = InstrumentManager.get_active_instruments(section_type, mood)
-        return instrument_name in active_list
+    def should_play(instrument_name, section_type, mood="chill", bar=None):
+        return InstrumentManager.arrangement().plays(instrument_name, section_type, mood, bar)
@@ -0,0 +1,280 @@
+"""
+Instrumentation
+Opt-in timing spans and counters for the generation hot paths.
+Disabled by default: span() then hands back a shared no-op context and
+count() returns after one flag check, so instrumented code pays almost
+nothing. Enable with enable() or LGEN_INSTRUMENT=1.
+
+    with span("lane", lane="bass"):
+        ...
+    count("section_cache_hits")
+
+Collected metrics export as JSON (snapshot / JSON-lines span logs via
+JsonLogHook) or as Prometheus text exposition (prometheus_text).
+Worker processes hand their metrics to the parent with drain() and
+merge(), so a process pool reports as one.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+METRIC_PREFIX = "lgen"
+
+_enabled = os.environ.get("LGEN_INSTRUMENT", "") not in ("", "0")
+_lock = threading.Lock()
+_spans: Dict[Tuple[str, tuple], List[float]] = {}  # (name, labels) -> [calls, total_s, max_s]
+_counters: Dict[Tuple[str, tuple], float] = {}
+_hooks: List[Callable[[Dict], None]] = []
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop all collected metrics (hooks stay registered)."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def add_hook(hook: Callable[[Dict], None]) -> None:
+    """Call `hook(event)` for every finished span: {"span", "labels", "start", "duration_s", "thread"}."""
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Dict], None]) -> None:
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def clear_hooks() -> None:
+    with _lock:
+        _hooks.clear()
+
+
+def has_hooks() -> bool:
+    return bool(_hooks)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'start', 'started')
+
+    def __init__(self, name: str, labels: tuple):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        key = (self.name, self.labels)
+        with _lock:
+            stat = _spans.get(key)
+            if stat is None:
+                _spans[key] = [1, elapsed, elapsed]
+            else:
+                stat[0] += 1
+                stat[1] += elapsed
+                if elapsed > stat[2]:
+                    stat[2] = elapsed
+            hooks = list(_hooks)
+        if hooks:
+            event = {
+                "span": self.name,
+                "labels": dict(self.labels),
+                "start": self.start,
+                "duration_s": elapsed,
+                "thread": threading.current_thread().name,
+            }
+            for hook in hooks:
+                hook(event)
+        return False
+
+
+def span(name: str, **labels):
+    """Context manager timing a block under `name` and optional labels."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, tuple(sorted(labels.items())))
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add `value` to a counter."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def timed(name: str, **labels):
+    """Decorator form of span(); the enabled check happens per call."""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name, tuple(sorted(labels.items()))):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def _collected() -> Dict[str, list]:
+    # Caller holds _lock
+    spans = [
+        {"span": name, "labels": dict(labels), "calls": int(calls), "total_s": total, "max_s": peak}
+        for (name, labels), (calls, total, peak) in sorted(_spans.items())
+    ]
+    counters = [
+        {"counter": name, "labels": dict(labels), "value": value}
+        for (name, labels), value in sorted(_counters.items())
+    ]
+    return {"spans": spans, "counters": counters}
+
+
+def snapshot() -> Dict[str, list]:
+    """Collected spans and counters as JSON-ready lists."""
+    with _lock:
+        return _collected()
+
+
+def drain() -> Dict[str, list]:
+    """snapshot() and reset() in one step, e.g. to hand a worker process's metrics to its parent."""
+    with _lock:
+        data = _collected()
+        _spans.clear()
+        _counters.clear()
+    return data
+
+
+def merge(data: Dict[str, list]) -> None:
+    """
+    Add a snapshot() (typically drained in another process) to the collected
+    metrics. Span events it carries under "events" are passed to the hooks
+    here, so only this process writes them.
+    """
+    with _lock:
+        for entry in data.get("spans", ()):
+            key = (entry["span"], tuple(sorted(entry["labels"].items())))
+            stat = _spans.get(key)
+            if stat is None:
+                _spans[key] = [entry["calls"], entry["total_s"], entry["max_s"]]
+            else:
+                stat[0] += entry["calls"]
+                stat[1] += entry["total_s"]
+                stat[2] = max(stat[2], entry["max_s"])
+        for entry in data.get("counters", ()):
+            key = (entry["counter"], tuple(sorted(entry["labels"].items())))
+            _counters[key] = _counters.get(key, 0) + entry["value"]
+        hooks = list(_hooks)
+    for event in data.get("events", ()):
+        for hook in hooks:
+            hook(event)
+
+
+def to_json(indent: Optional[int] = None) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Dict, extra: Optional[Dict] = None) -> str:
+    items = dict(labels, **(extra or {}))
+    if not items:
+        return ""
+    body = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(items.items()))
+    return "{" + body + "}"
+
+
+def prometheus_text() -> str:
+    """Prometheus text exposition of the collected spans and counters."""
+    data = snapshot()
+    lines = []
+    if data["spans"]:
+        for metric, field, kind, help_text in (
+            ("span_seconds_total", "total_s", "counter", "Total seconds spent in each span"),
+            ("span_calls_total", "calls", "counter", "Number of times each span ran"),
+            ("span_seconds_max", "max_s", "gauge", "Slowest single run of each span"),
+        ):
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for entry in data["spans"]:
+                labels = _label_text(entry["labels"], {"span": entry["span"]})
+                lines.append(f"{name}{labels} {entry[field]}")
+
+    seen = set()
+    for entry in data["counters"]:
+        name = f"{METRIC_PREFIX}_{entry['counter']}_total"
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_label_text(entry['labels'])} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+
+class JsonLogHook:
+    """Span hook writing one JSON object per finished span (structured logs)."""
+
+    def __init__(self, fp: TextIO):
+        self.fp = fp
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict) -> None:
+        line = json.dumps(event)
+        with self._lock:
+            self.fp.write(line + "\n")
+
+
+class EventBuffer:
+    """Span hook keeping events in memory until drain(), e.g. to send them to another process."""
+
+    def __init__(self):
+        self.events: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def drain(self) -> List[Dict]:
+        with self._lock:
+            events, self.events = self.events, []
+        return events
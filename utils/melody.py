@@ -0,0 +1,152 @@
+"""
+Melody Engine
+Generates a whole section's melody in one call. Candidate pitches for
+each chord are precomputed across the melody range, rhythm comes from
+weighted one-bar cells, and each note is drawn from a cached cumulative
+table combining chord-tone emphasis, step size and a section contour,
+so a note costs one table lookup, one bisect and one pre-drawn random.
+"""
+
+import math
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+from utils.music_theory import MusicTheory
+from utils.rng import resolve
+
+# One-bar rhythm cells (quarter lengths summing to 4.0) and their weights per mood
+RHYTHM_CELLS = {
+    "chill": [
+        ((1.0, 1.0, 1.0, 1.0), 4),
+        ((2.0, 1.0, 1.0), 3),
+        ((1.5, 0.5, 2.0), 2),
+        ((1.0, 1.0, 2.0), 3),
+        ((3.0, 1.0), 1),
+        ((1.5, 0.5, 1.0, 1.0), 2),
+    ],
+    "energetic": [
+        ((1.0, 1.0, 1.0, 1.0), 3),
+        ((0.5, 0.5, 1.0, 0.5, 0.5, 1.0), 3),
+        ((1.0, 0.5, 0.5, 1.0, 1.0), 3),
+        ((0.5, 0.5, 0.5, 0.5, 1.0, 1.0), 2),
+        ((1.5, 0.5, 1.0, 1.0), 2),
+        ((0.5,) * 8, 1),
+    ],
+}
+
+# Contour shapes: target height (0 = bottom of range, 1 = top) at a position 0..1 through the section
+CONTOURS = {
+    "arch": lambda t: 0.3 + 0.5 * math.sin(math.pi * t),
+    "rise": lambda t: 0.25 + 0.5 * t,
+    "fall": lambda t: 0.75 - 0.5 * t,
+    "wave": lambda t: 0.5 + 0.25 * math.sin(2 * math.pi * t),
+}
+
+# Melody range (MIDI) per section type
+RANGES = {
+    "chorus": (67, 88),
+}
+DEFAULT_RANGE = (60, 81)
+
+CHORD_TONE_WEIGHT = {True: 4.0, False: 1.5}  # on strong beats, off strong beats
+SCALE_TONE_WEIGHT = 1.0
+STEP_DECAY = 0.35   # per semitone of movement
+LEAP_LIMIT = 9      # larger intervals are only taken as a last resort
+CONTOUR_DECAY = 0.15
+STRONG_VELOCITY = 76
+WEAK_VELOCITY = 66
+
+# Weight tables kept in the LRU (one per chord, previous pitch, beat strength and contour target)
+TABLE_CACHE_SIZE = 4096
+
+
+class MelodyEngine:
+    _candidates: Dict[tuple, Tuple[Tuple[int, ...], Tuple[bool, ...]]] = {}
+    _cells: Dict[str, Tuple[tuple, Tuple[float, ...], float]] = {}
+
+    @classmethod
+    def candidates(cls, chord_root: str, chord_type: str, key_root: str, scale_type: str,
+                   low: int, high: int) -> Tuple[Tuple[int, ...], Tuple[bool, ...]]:
+        """(pitches, is_chord_tone) for every scale or chord tone in [low, high]."""
+        key = (chord_root, chord_type, key_root, scale_type, low, high)
+        found = cls._candidates.get(key)
+        if found is None:
+            chord = MusicTheory.chord_set(chord_root, chord_type)
+            allowed = chord | MusicTheory.scale_set(key_root, scale_type)
+            pitches = tuple(p for p in range(low, high + 1) if (allowed >> (p % 12)) & 1)
+            found = cls._candidates[key] = (pitches, tuple(p in chord for p in pitches))
+        return found
+
+    @classmethod
+    @lru_cache(maxsize=TABLE_CACHE_SIZE)
+    def _table(cls, candidate_key: tuple, previous, strong: bool, target: int) -> Tuple[Tuple[float, ...], float]:
+        """Cumulative weights over a chord's candidates given the previous pitch, beat strength and contour target."""
+        pitches, chord_tones = cls.candidates(*candidate_key)
+        running = 0.0
+        cumulative = []
+        for pitch, is_chord_tone in zip(pitches, chord_tones):
+            weight = CHORD_TONE_WEIGHT[strong] if is_chord_tone else SCALE_TONE_WEIGHT
+            if previous is not None:
+                step = abs(pitch - previous)
+                weight *= math.exp(-STEP_DECAY * step) * (1.0 if step else 0.5)
+                if step > LEAP_LIMIT:
+                    weight *= 1e-3
+            weight *= math.exp(-CONTOUR_DECAY * abs(pitch - target))
+            running += weight
+            cumulative.append(running)
+        return tuple(cumulative), running
+
+    @classmethod
+    def _cell_table(cls, mood: str):
+        found = cls._cells.get(mood)
+        if found is None:
+            cells = RHYTHM_CELLS.get(mood, RHYTHM_CELLS["chill"])
+            running = 0.0
+            cumulative = []
+            for _, weight in cells:
+                running += weight
+                cumulative.append(running)
+            found = cls._cells[mood] = (tuple(cell for cell, _ in cells), tuple(cumulative), running)
+        return found
+
+    @classmethod
+    def generate_section(cls, chords: Sequence[Tuple[str, str]], key_root: str, scale_type: str,
+                         section_type: str = "verse", mood: str = "chill", rng=None) -> List[List[Tuple[float, int, int]]]:
+        """
+        Melody for a section: one list of (duration, pitch, velocity) per
+        chord (bar). All random numbers are drawn up front in one batch.
+        """
+        rng = resolve(rng)
+        random = rng.random
+        low, high = RANGES.get(section_type, DEFAULT_RANGE)
+        cells, cell_cumulative, cell_total = cls._cell_table(mood)
+
+        rhythm = [cells[bisect_right(cell_cumulative, random() * cell_total)] for _ in chords]
+        contour_names = sorted(CONTOURS)
+        contour = CONTOURS[contour_names[int(random() * len(contour_names))]]
+        note_count = sum(len(cell) for cell in rhythm)
+        draws = [random() for _ in range(note_count)]
+
+        span = high - low
+        section_length = 4.0 * len(chords) or 1.0
+        bars = []
+        previous = None
+        n = 0
+        for index, (chord_root, chord_type) in enumerate(chords):
+            candidate_key = (chord_root, chord_type, key_root, scale_type, low, high)
+            pitches = cls.candidates(*candidate_key)[0]
+            bar = []
+            offset = 0.0
+            for duration in rhythm[index]:
+                strong = offset % 2.0 == 0.0
+                position = (index * 4.0 + offset) / section_length
+                target = low + int(round(contour(position) * span))
+                cumulative, total = cls._table(candidate_key, previous, strong, target)
+                pitch = pitches[min(bisect_right(cumulative, draws[n] * total), len(pitches) - 1)]
+                bar.append((duration, pitch, STRONG_VELOCITY if strong else WEAK_VELOCITY))
+                previous = pitch
+                offset += duration
+                n += 1
+            bars.append(bar)
+        return bars
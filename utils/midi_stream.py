@@ -0,0 +1,179 @@
+"""
+MIDI Stream
+Sinks that turn note events into MIDI messages as they are produced,
+instead of writing a finished file: a single-track SMF stream and a
+real-time sink that sends raw messages on a wall clock.
+"""
+
+import heapq
+import struct
+import time
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from utils.events import NoteEvent
+from utils.midi_writer import NOTE_OFF, NOTE_ON, PERCUSSION_CHANNEL, PITCH_BEND, PROGRAM_CHANGE, TICKS_PER_QUARTER, encode_varlen
+
+# Length written for the track chunk when the output cannot be patched afterwards
+UNKNOWN_LENGTH = 0xFFFFFFFF
+
+
+class MessageScheduler:
+    """
+    Turns bars of note events into (tick, message) pairs in time order.
+    Pending note-offs wait in a heap; at equal ticks they are sent before
+    note-ons, as in the file writer.
+    """
+
+    def __init__(self, ticks: int = TICKS_PER_QUARTER):
+        self.ticks = ticks
+        self._offs: List[Tuple[int, int, bytes]] = []
+        self._order = 0
+
+    def _due_offs(self, tick: int) -> Iterator[Tuple[int, bytes]]:
+        while self._offs and self._offs[0][0] <= tick:
+            off_tick, _, message = heapq.heappop(self._offs)
+            yield off_tick, message
+
+    def feed(self, events: Iterable[NoteEvent], until: Optional[float] = None) -> Iterator[Tuple[int, bytes]]:
+        """
+        Messages for events sorted by offset. Note-offs up to `until`
+        (quarter lengths, e.g. the end of the bar) are flushed too.
+        """
+        for ev in events:
+            start = int(round(ev.offset * self.ticks))
+            end = int(round((ev.offset + ev.duration) * self.ticks))
+            channel = ev.channel & 0x0F
+            velocity = max(1, min(127, int(ev.velocity if ev.velocity is not None else 90)))
+
+            yield from self._due_offs(start)
+            yield start, bytes((NOTE_ON | channel, ev.pitch & 0x7F, velocity))
+            heapq.heappush(self._offs, (end, self._order, bytes((NOTE_OFF | channel, ev.pitch & 0x7F, 0))))
+            self._order += 1
+
+        if until is not None:
+            yield from self._due_offs(int(round(until * self.ticks)))
+
+    def flush(self) -> Iterator[Tuple[int, bytes]]:
+        """All remaining note-offs."""
+        while self._offs:
+            off_tick, _, message = heapq.heappop(self._offs)
+            yield off_tick, message
+
+
+def setup_messages(channels: Iterable[Tuple[int, Optional[int]]]) -> List[bytes]:
+    """Program change (skipped for percussion) and pitch bend reset for each (channel, program)."""
+    messages = []
+    for channel, program in channels:
+        channel &= 0x0F
+        if program is not None and channel != PERCUSSION_CHANNEL:
+            messages.append(bytes((PROGRAM_CHANGE | channel, program)))
+        messages.append(bytes((PITCH_BEND | channel, 0x00, 0x40)))
+    return messages
+
+
+class SMFStreamWriter:
+    """
+    Writes a format 0 Standard MIDI File incrementally. The track length is
+    patched on close when the file is seekable; on pipes it is left as
+    0xFFFFFFFF, which streaming readers treat as "until end of track".
+    """
+
+    def __init__(self, fp: BinaryIO, bpm: float, channels: Iterable[Tuple[int, Optional[int]]] = (),
+                 ticks: int = TICKS_PER_QUARTER):
+        self.fp = fp
+        self.ticks = ticks
+        self._now = 0
+        self._size = 0
+        self._closed = False
+
+        fp.write(b'MThd' + struct.pack('>IHHH', 6, 0, 1, ticks))
+        try:
+            self._length_pos = fp.tell() + 4
+        except (OSError, AttributeError):
+            self._length_pos = None
+        fp.write(b'MTrk' + struct.pack('>I', UNKNOWN_LENGTH))
+
+        mspq = int(round(60_000_000 / bpm))
+        self._emit(b'\x00\xff\x51\x03' + mspq.to_bytes(3, 'big'))
+        self._emit(b'\x00\xff\x58\x04\x04\x02\x18\x08')
+        for message in setup_messages(channels):
+            self.write(0, message)
+
+    def _emit(self, data: bytes) -> None:
+        self.fp.write(data)
+        self._size += len(data)
+
+    def write(self, tick: int, message: bytes) -> None:
+        """Write a message at an absolute tick (ticks must not go backwards)."""
+        self._emit(encode_varlen(max(0, tick - self._now)) + message)
+        self._now = max(self._now, tick)
+
+    def write_all(self, messages: Iterable[Tuple[int, bytes]]) -> None:
+        for tick, message in messages:
+            self.write(tick, message)
+        if hasattr(self.fp, 'flush'):
+            self.fp.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._emit(encode_varlen(self.ticks) + b'\xff\x2f\x00')
+        if self._length_pos is not None:
+            try:
+                end = self.fp.tell()
+                self.fp.seek(self._length_pos)
+                self.fp.write(struct.pack('>I', self._size))
+                self.fp.seek(end)
+            except OSError:
+                pass
+        if hasattr(self.fp, 'flush'):
+            self.fp.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RealtimeSink:
+    """
+    Sends raw MIDI messages through `send(bytes)` (e.g. a MIDI device file
+    opened unbuffered) at their wall-clock time for the given tempo.
+    """
+
+    def __init__(self, send: Callable[[bytes], object], bpm: float, channels: Iterable[Tuple[int, Optional[int]]] = (),
+                 ticks: int = TICKS_PER_QUARTER, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], object] = time.sleep):
+        self.send = send
+        self.seconds_per_tick = 60.0 / (bpm * ticks)
+        self.clock = clock
+        self.sleep = sleep
+        self.channels = [channel & 0x0F for channel, _ in channels]
+        self.start = None
+        for message in setup_messages(channels):
+            send(message)
+
+    def write(self, tick: int, message: bytes) -> None:
+        if self.start is None:
+            self.start = self.clock()
+        delay = self.start + tick * self.seconds_per_tick - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        self.send(message)
+
+    def write_all(self, messages: Iterable[Tuple[int, bytes]]) -> None:
+        for tick, message in messages:
+            self.write(tick, message)
+
+    def close(self) -> None:
+        """Silence every channel that was set up (All Notes Off)."""
+        for channel in self.channels:
+            self.send(bytes((0xB0 | channel, 123, 0)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,107 @@
+"""
+MIDI Writer
+Writes Standard MIDI Files (format 1) straight from note events,
+without building or flattening music21 streams.
+The layout follows music21's own MIDI export: a conductor track with
+tempo and 4/4 time signature, then one track per instrument.
+"""
+
+import struct
+from typing import BinaryIO, Iterable, List, Optional, Union
+
+from utils.events import NoteEvent
+
+TICKS_PER_QUARTER = 10080
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+PROGRAM_CHANGE = 0xC0
+PITCH_BEND = 0xE0
+PERCUSSION_CHANNEL = 9  # GM drums (channel 10)
+
+
+def encode_varlen(value: int) -> bytes:
+    """Encode an int as a MIDI variable-length quantity."""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+
+class MidiTrack:
+    """One instrument track: name, GM program (None for percussion), channel and events"""
+
+    __slots__ = ('name', 'program', 'channel', 'events')
+
+    def __init__(self, name: str, program: Optional[int], channel: int, events: Iterable[NoteEvent]):
+        self.name = name
+        self.program = program
+        self.channel = channel
+        self.events = events
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return tag + struct.pack('>I', len(data)) + data
+
+
+def _conductor_track(bpm: float, ticks: int) -> bytes:
+    mspq = int(round(60_000_000 / bpm))
+    data = bytearray()
+    data += b'\x00\xff\x51\x03' + mspq.to_bytes(3, 'big')
+    data += b'\x00\xff\x58\x04\x04\x02\x18\x08'
+    data += encode_varlen(ticks) + b'\xff\x2f\x00'
+    return bytes(data)
+
+
+def _note_track(track: MidiTrack, ticks: int) -> bytes:
+    channel = track.channel & 0x0F
+    name = track.name.encode('utf-8')
+
+    data = bytearray()
+    data += b'\x00\xff\x03' + encode_varlen(len(name)) + name
+    # One program change per track; none on the GM percussion channel, where it would switch drum kits
+    if track.program is not None and channel != PERCUSSION_CHANNEL:
+        data += bytes((0, PROGRAM_CHANGE | channel, track.program))
+    data += bytes((0, PITCH_BEND | channel, 0x00, 0x40))
+
+    # (tick, is_on, order, pitch, velocity): at equal ticks note-offs sort before note-ons
+    messages = []
+    for order, ev in enumerate(track.events):
+        start = int(round(ev.offset * ticks))
+        end = int(round((ev.offset + ev.duration) * ticks))
+        velocity = max(1, min(127, int(ev.velocity if ev.velocity is not None else 90)))
+        messages.append((start, 1, order, ev.pitch, velocity))
+        messages.append((end, 0, order, ev.pitch, 0))
+    messages.sort()
+
+    now = 0
+    for tick, is_on, _, pitch, velocity in messages:
+        data += encode_varlen(tick - now)
+        data += bytes(((NOTE_ON if is_on else NOTE_OFF) | channel, pitch & 0x7F, velocity))
+        now = tick
+
+    data += encode_varlen(ticks) + b'\xff\x2f\x00'
+    return bytes(data)
+
+
+def midi_bytes(tracks: List[MidiTrack], bpm: float, ticks: int = TICKS_PER_QUARTER) -> bytes:
+    """Render tracks to a complete Standard MIDI File in memory."""
+    out = bytearray()
+    out += _chunk(b'MThd', struct.pack('>HHH', 1, len(tracks) + 1, ticks))
+    out += _chunk(b'MTrk', _conductor_track(bpm, ticks))
+    for track in tracks:
+        out += _chunk(b'MTrk', _note_track(track, ticks))
+    return bytes(out)
+
+
+def write_midi(tracks: List[MidiTrack], bpm: float, fp: Union[str, BinaryIO],
+               ticks: int = TICKS_PER_QUARTER) -> None:
+    """Write a Standard MIDI File to a path or binary file object (e.g. io.BytesIO)."""
+    data = midi_bytes(tracks, bpm, ticks)
+    if isinstance(fp, (str, bytes)) or hasattr(fp, '__fspath__'):
+        with open(fp, 'wb') as f:
+            f.write(data)
+    else:
+        fp.write(data)
@@ -5,8 +5,10 @@ Enhanced with Sharp and Flat support.
 """
 
 import random
-from typing import List, Tuple, Dict
-# import numpy as np
+from typing import List, Tuple, Dict, Optional
+
+from utils.pitch_classes import PitchClassSet, build_sets
+from utils.rng import resolve
 
 
 class MusicTheory:
@@ -70,6 +72,16 @@ class MusicTheory:
         'VII': ('maj7', 10),
     }
     
+    # Lookup tables filled by build_tables() and on first use of new inputs
+    _chord_table: Dict[tuple, Tuple[int, ...]] = {}
+    _scale_table: Dict[tuple, Tuple[int, ...]] = {}
+    _roman_table: Dict[tuple, Tuple[str, str]] = {}
+    _pitch_class_table: Dict[tuple, Tuple[int, ...]] = {}
+
+    # (root pitch class, name) -> PitchClassSet for every chord formula and scale, filled below the class
+    CHORD_SETS: Dict[tuple, PitchClassSet] = {}
+    SCALE_SETS: Dict[tuple, PitchClassSet] = {}
+    
     @classmethod
     def note_to_midi(cls, note_name: str, octave: int = 4) -> int:
         """Convert note name (C, C#, Db, etc.) to MIDI note number"""
@@ -102,22 +114,38 @@ class MusicTheory:
         return 440.0 * (2.0 ** ((midi - 69) / 12.0))
     
     @classmethod
-    def get_scale(cls, root: str, scale_type: str = 'major', octave: int = 4) -> List[int]:
-        """Get scale as a list of MIDI numbers"""
-        root_midi = cls.note_to_midi(root, octave)
-        intervals = cls.SCALES.get(scale_type, cls.SCALES['major'])
-        return [root_midi + interval for interval in intervals]
+    def get_scale(cls, root: str, scale_type: str = 'major', octave: int = 4) -> Tuple[int, ...]:
+        """Get scale as a tuple of MIDI numbers (table lookup)"""
+        cache_key = (root, scale_type, octave)
+        scale = cls._scale_table.get(cache_key)
+        if scale is None:
+            root_midi = cls.note_to_midi(root, octave)
+            intervals = cls.SCALES.get(scale_type, cls.SCALES['major'])
+            scale = cls._scale_table[cache_key] = tuple(root_midi + interval for interval in intervals)
+        return scale
     
     @classmethod
-    def get_chord(cls, root: str, chord_type: str = 'maj', octave: int = 4) -> List[int]:
-        """Get chord as a list of MIDI numbers"""
-        root_midi = cls.note_to_midi(root, octave)
-        intervals = cls.CHORD_FORMULAS.get(chord_type, cls.CHORD_FORMULAS['maj'])
-        return [root_midi + interval for interval in intervals]
+    def get_chord(cls, root: str, chord_type: str = 'maj', octave: int = 4) -> Tuple[int, ...]:
+        """Get chord as a tuple of MIDI numbers (table lookup)"""
+        cache_key = (root, chord_type, octave)
+        chord = cls._chord_table.get(cache_key)
+        if chord is None:
+            root_midi = cls.note_to_midi(root, octave)
+            intervals = cls.CHORD_FORMULAS.get(chord_type, cls.CHORD_FORMULAS['maj'])
+            chord = cls._chord_table[cache_key] = tuple(root_midi + interval for interval in intervals)
+        return chord
     
     @classmethod
     def parse_roman_numeral(cls, roman: str, key: str, is_minor: bool = False) -> Tuple[str, str]:
-        """Parse Roman numeral chord notation."""
+        """Parse Roman numeral chord notation (memoized per key, mode and symbol)."""
+        cache_key = (roman, key, is_minor)
+        parsed = cls._roman_table.get(cache_key)
+        if parsed is None:
+            parsed = cls._roman_table[cache_key] = cls._parse_roman_numeral(roman, key, is_minor)
+        return parsed
+    
+    @classmethod
+    def _parse_roman_numeral(cls, roman: str, key: str, is_minor: bool) -> Tuple[str, str]:
         progressions = cls.ROMAN_PROGRESSIONS_MINOR if is_minor else cls.ROMAN_PROGRESSIONS_MAJOR
         base_roman = ''.join(c for c in roman if c in 'IViv')
         
@@ -149,23 +177,24 @@ class MusicTheory:
         for roman in progression:
             chord_root, chord_type = cls.parse_roman_numeral(roman, key, is_minor)
             chord_notes = cls.get_chord(chord_root, chord_type, octave)
-            chords.append(chord_notes)
+            chords.append(list(chord_notes))
         return chords
     
     @classmethod
     def generate_random_progression(cls, length: int = 4, key: str = 'C', 
-                                   is_minor: bool = False) -> List[str]:
+                                   is_minor: bool = False, rng: Optional[random.Random] = None) -> List[str]:
+        rng = resolve(rng)
         preferred_chords = ['I', 'ii', 'IV', 'V', 'vi'] if not is_minor else ['i', 'iv', 'v', 'VI', 'VII']
         progression = []
         for i in range(length):
             if i == 0:
                 chord = 'i' if is_minor else 'I'
             elif i == length - 1:
-                chord = random.choice(['V', 'I'] if not is_minor else ['v', 'i'])
+                chord = rng.choice(['V', 'I'] if not is_minor else ['v', 'i'])
             else:
-                chord = random.choice(preferred_chords)
+                chord = rng.choice(preferred_chords)
             
-            if random.random() > 0.3:
+            if rng.random() > 0.3:
                 chord += 'maj7' if chord.isupper() and 'V' not in chord else 'm7'
             progression.append(chord)
         return progression
@@ -174,10 +203,11 @@ class MusicTheory:
     def get_voicing(cls, chord_notes: List[int], voicing_type: str = 'close') -> List[int]:
         if voicing_type == 'close': return chord_notes
         elif voicing_type == 'open':
-            return [chord_notes[0], chord_notes[1] + 12, chord_notes[2] + 12]
+            # Root stays in the bass; every upper tone (7th and beyond included) moves up an octave
+            return [chord_notes[0]] + [note + 12 for note in chord_notes[1:]]
         elif voicing_type == 'drop2':
             if len(chord_notes) >= 3:
-                result = chord_notes.copy()
+                result = list(chord_notes)
                 result[-2] -= 12
                 return sorted(result)
             return chord_notes
@@ -188,10 +218,62 @@ class MusicTheory:
         return chord_notes
 
     @classmethod
-    def get_chord_notes_indices(cls, chord_root: str, chord_type: str) -> List[int]:
-        root_idx = cls.NOTE_MAP[chord_root.capitalize()]
-        intervals = cls.CHORD_FORMULAS.get(chord_type, [0, 4, 7])
-        return [(root_idx + i) % 12 for i in intervals]
+    def pitch_class(cls, note_name: str) -> int:
+        return cls.NOTE_MAP[note_name.capitalize()]
+
+    @classmethod
+    def chord_set(cls, root: str, chord_type: str) -> PitchClassSet:
+        """Pitch-class set of a chord (unknown types fall back to a major triad)."""
+        root_pc = cls.pitch_class(root)
+        chord = cls.CHORD_SETS.get((root_pc, chord_type))
+        return chord if chord is not None else cls.CHORD_SETS[(root_pc, 'maj')]
+
+    @classmethod
+    def scale_set(cls, root: str, scale_type: str = 'major') -> PitchClassSet:
+        """Pitch-class set of a scale (unknown types fall back to major)."""
+        root_pc = cls.pitch_class(root)
+        scale = cls.SCALE_SETS.get((root_pc, scale_type))
+        return scale if scale is not None else cls.SCALE_SETS[(root_pc, 'major')]
+
+    @classmethod
+    def chord_fits_scale(cls, chord_root: str, chord_type: str, scale_root: str, scale_type: str) -> bool:
+        return cls.chord_set(chord_root, chord_type).fits(cls.scale_set(scale_root, scale_type))
+
+    @classmethod
+    def get_chord_notes_indices(cls, chord_root: str, chord_type: str) -> Tuple[int, ...]:
+        cache_key = (chord_root, chord_type)
+        indices = cls._pitch_class_table.get(cache_key)
+        if indices is None:
+            root_idx = cls.NOTE_MAP[chord_root.capitalize()]
+            intervals = cls.CHORD_FORMULAS.get(chord_type, [0, 4, 7])
+            indices = cls._pitch_class_table[cache_key] = tuple((root_idx + i) % 12 for i in intervals)
+        return indices
+
+    @classmethod
+    def build_tables(cls, octaves: range = range(0, 9)) -> None:
+        """
+        Precompute the finite lookup space: chords and scales for every root
+        and octave, and every Roman numeral (plain, maj7, m7) in every key.
+        Lookups are memoized anyway; long-lived workers call this up front.
+        """
+        for root in cls.NOTES_SHARP:
+            for chord_type in cls.CHORD_FORMULAS:
+                cls.get_chord_notes_indices(root, chord_type)
+                for octave in octaves:
+                    cls.get_chord(root, chord_type, octave)
+            for scale_type in cls.SCALES:
+                for octave in octaves:
+                    cls.get_scale(root, scale_type, octave)
+
+        for key in dict.fromkeys(cls.NOTES_SHARP + cls.NOTES_FLAT):
+            for is_minor, progressions in ((False, cls.ROMAN_PROGRESSIONS_MAJOR), (True, cls.ROMAN_PROGRESSIONS_MINOR)):
+                for numeral in progressions:
+                    for suffix in ('', 'maj7', 'm7'):
+                        cls.parse_roman_numeral(numeral + suffix, key, is_minor)
+
+
+MusicTheory.CHORD_SETS.update(build_sets(MusicTheory.CHORD_FORMULAS))
+MusicTheory.SCALE_SETS.update(build_sets(MusicTheory.SCALES))
 
 
 class RhythmGenerator:
@@ -208,16 +290,20 @@ class RhythmGenerator:
         return timings
     
     @staticmethod
-    def humanize_timing(timings: List[float], amount: float = 0.02) -> List[float]:
-        return [t + random.uniform(-amount, amount) for t in timings]
+    def humanize_timing(timings: List[float], amount: float = 0.02,
+                        rng: Optional[random.Random] = None) -> List[float]:
+        rng = resolve(rng)
+        return [t + rng.uniform(-amount, amount) for t in timings]
     
     @staticmethod
-    def generate_velocity_curve(length: int, curve_type: str = 'crescendo') -> List[int]:
+    def generate_velocity_curve(length: int, curve_type: str = 'crescendo',
+                                rng: Optional[random.Random] = None) -> List[int]:
         if curve_type == 'crescendo':
             return [int(60 + (i / length) * 40) for i in range(length)]
         elif curve_type == 'diminuendo':
             return [int(100 - (i / length) * 40) for i in range(length)]
         elif curve_type == 'random':
-            return [70 + random.randint(-20, 20) for _ in range(length)]
+            rng = resolve(rng)
+            return [70 + rng.randint(-20, 20) for _ in range(length)]
         else:
             return [80] * length
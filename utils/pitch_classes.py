@@ -0,0 +1,69 @@
+"""
+Pitch-Class Sets
+12-bit sets of pitch classes (bit n = pitch class n, C = 0). Membership,
+subset tests, common tones and transposition are integer operations, and
+the ordered pitch classes of any set are a memoized table lookup.
+"""
+
+from typing import Dict, Iterable, Tuple
+
+FULL = 0xFFF
+
+_ordered: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+
+
+class PitchClassSet(int):
+    """An int whose low 12 bits are the pitch classes it contains."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_pitches(cls, pitches: Iterable[int]) -> 'PitchClassSet':
+        bits = 0
+        for pitch in pitches:
+            bits |= 1 << (pitch % 12)
+        return cls(bits)
+
+    def __contains__(self, pitch: int) -> bool:
+        return (self >> (pitch % 12)) & 1 == 1
+
+    def __len__(self) -> int:
+        return bin(self).count('1')
+
+    def __repr__(self):
+        return f"PitchClassSet({list(self.pitch_classes())})"
+
+    def transpose(self, semitones: int) -> 'PitchClassSet':
+        """Rotate the set up by `semitones`."""
+        shift = semitones % 12
+        return PitchClassSet(((self << shift) | (self >> (12 - shift))) & FULL)
+
+    def common_tones(self, other: int) -> int:
+        return bin(self & other).count('1')
+
+    def is_subset(self, other: int) -> bool:
+        return self & ~other & FULL == 0
+
+    def fits(self, scale: int) -> bool:
+        """True when every tone of this chord belongs to `scale`."""
+        return self & ~scale & FULL == 0
+
+    def pitch_classes(self, start: int = 0) -> Tuple[int, ...]:
+        """Members in ascending order, beginning at `start` and wrapping round the octave."""
+        key = (int(self), start % 12)
+        ordered = _ordered.get(key)
+        if ordered is None:
+            ordered = _ordered[key] = tuple(
+                (start + step) % 12 for step in range(12) if (self >> ((start + step) % 12)) & 1
+            )
+        return ordered
+
+
+def build_sets(formulas: Dict[str, Iterable[int]]) -> Dict[Tuple[int, str], PitchClassSet]:
+    """{(root pitch class, name): set} for every formula in all 12 transpositions."""
+    sets = {}
+    for name, intervals in formulas.items():
+        base = PitchClassSet.from_pitches(intervals)
+        for root in range(12):
+            sets[(root, name)] = base.transpose(root)
+    return sets
@@ -0,0 +1,159 @@
+"""
+Progression Model
+Markov chord-progression model trained on the template progressions.
+Transitions are counted per (section, mode) with a pooled per-mode
+fallback, weighted by mood, and compiled into cumulative-probability
+arrays so each chord is drawn with one random() and a bisect.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.rng import resolve
+
+START = "^"
+ORDER = 2
+
+# Used when the templates yield nothing for a mode
+FALLBACK_VOCABULARY = {
+    "major": ["I", "ii", "IV", "V", "vi"],
+    "minor": ["i", "iv", "v", "VI", "VII"],
+}
+
+
+def seventh(chord: str) -> str:
+    """Add the diatonic seventh: V -> V7, other upper-case -> maj7, lower-case -> m7."""
+    if chord == "V":
+        return chord + "7"
+    return chord + ("maj7" if chord[:1].isupper() else "m7")
+
+
+def iter_template_progressions(get, section_files: Dict[str, str]) -> Iterable[Tuple[str, str, List[str]]]:
+    """
+    (section, mode, progression) for every template progression. `get` is
+    a registry lookup by file name; a file is either {mode: [...]} for the
+    section it is mapped to, or {section: {mode: [...]}}.
+    """
+    seen = set()
+    for section, filename in section_files.items():
+        if filename in seen:
+            continue
+        seen.add(filename)
+        data = get(filename)
+        if not isinstance(data, dict):
+            continue
+        for name, value in data.items():
+            if isinstance(value, list):
+                for prog in value:
+                    yield section, name, prog
+            elif isinstance(value, dict):
+                for mode, progressions in value.items():
+                    for prog in progressions:
+                        yield name, mode, prog
+
+
+class _Table:
+    """Cumulative distribution over next chords for one context."""
+
+    __slots__ = ('chords', 'cumulative', 'total')
+
+    def __init__(self, weights: Dict[str, float]):
+        self.chords = tuple(sorted(weights))
+        running = 0.0
+        cumulative = []
+        for chord in self.chords:
+            running += weights[chord]
+            cumulative.append(running)
+        self.cumulative = tuple(cumulative)
+        self.total = running
+
+    def sample(self, random) -> str:
+        return self.chords[bisect_right(self.cumulative, random() * self.total)]
+
+
+class ProgressionModel:
+    """
+    Order-2 Markov model with back-off (order 2 -> order 1 -> chord
+    frequency), per (section, mode), falling back to the pooled model for
+    the mode when a section has no templates. The last chord of a
+    progression is drawn from transitions that ended a template, so
+    generated progressions resolve the way the templates do.
+    `moods` maps a mood to {"chord_bias": {chord: weight}, "seventh_probability": p}.
+    """
+
+    def __init__(self, progressions: Iterable[Tuple[str, str, List[str]]], moods: Optional[Dict] = None):
+        self.moods = moods or {}
+        self._counts = defaultdict(lambda: defaultdict(float))  # (scope, mode, final, context) -> {chord: count}
+        self.vocabulary: Dict[str, set] = defaultdict(set)
+
+        for section, mode, prog in progressions:
+            if not prog:
+                continue
+            self.vocabulary[mode].update(prog)
+            for scope in (section, None):
+                history = (START,) * ORDER
+                for index, chord in enumerate(prog):
+                    final = index == len(prog) - 1
+                    for order in range(ORDER, -1, -1):
+                        context = history[ORDER - order:]
+                        self._counts[(scope, mode, False, context)][chord] += 1
+                        if final:
+                            self._counts[(scope, mode, True, context)][chord] += 1
+                    history = history[1:] + (chord,)
+
+        self._tables: Dict[tuple, Optional[_Table]] = {}
+
+    @classmethod
+    def from_templates(cls, get, section_files: Dict[str, str], moods: Optional[Dict] = None) -> 'ProgressionModel':
+        return cls(iter_template_progressions(get, section_files), moods)
+
+    def _table(self, section, mode, mood, final, history) -> _Table:
+        """Most specific compiled table for the context, compiling it on first use."""
+        key = (section, mode, mood, final, history)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        bias = self.moods.get(mood, {}).get("chord_bias", {})
+        for scope in (section, None):
+            for order in range(ORDER, -1, -1):
+                for is_final in ((True, False) if final else (False,)):
+                    counts = self._counts.get((scope, mode, is_final, history[ORDER - order:]))
+                    if counts:
+                        table = _Table({c: n * bias.get(c, 1.0) for c, n in counts.items()})
+                        break
+                if table is not None:
+                    break
+            if table is not None:
+                break
+        if table is None:
+            vocabulary = self.vocabulary.get(mode) or FALLBACK_VOCABULARY.get(mode, FALLBACK_VOCABULARY["major"])
+            table = _Table({c: bias.get(c, 1.0) for c in vocabulary})
+
+        self._tables[key] = table
+        return table
+
+    def generate(self, length: int = 4, section: Optional[str] = None, is_minor: bool = False,
+                 mood: Optional[str] = None, rng=None) -> List[str]:
+        """One progression of `length` Roman numerals."""
+        rng = resolve(rng)
+        random = rng.random
+        mode = "minor" if is_minor else "major"
+        seventh_probability = self.moods.get(mood, {}).get("seventh_probability", 0.0)
+
+        history = (START,) * ORDER
+        progression = []
+        for index in range(length):
+            chord = self._table(section, mode, mood, index == length - 1, history).sample(random)
+            history = history[1:] + (chord,)
+            if seventh_probability and random() < seventh_probability:
+                chord = seventh(chord)
+            progression.append(chord)
+        return progression
+
+    def generate_many(self, count: int, length: int = 4, section: Optional[str] = None, is_minor: bool = False,
+                      mood: Optional[str] = None, rng=None) -> List[List[str]]:
+        """`count` progressions from one RNG stream, e.g. for catalog generation."""
+        rng = resolve(rng)
+        return [self.generate(length, section, is_minor, mood, rng) for _ in range(count)]
@@ -0,0 +1,162 @@
+"""
+Render Cache
+Persistent, content-addressed cache of rendered MIDI files.
+Entries are keyed by (seed, template set hash, code version, options),
+written with atomic renames so concurrent writers never expose partial
+files, and evicted by total size and age.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+def fingerprint_files(paths: Iterable[str]) -> str:
+    """sha256 over the names and contents of files (missing files are skipped)."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        digest.update(data + b'\0')
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RenderCache:
+    """
+    On-disk cache: <cache_dir>/<key[:2]>/<key>.mid plus a <key>.json sidecar
+    holding the song info. A hit refreshes the entry's mtime, so size
+    eviction drops the least recently used entries first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None, max_age: Optional[float] = None,
+                 evict_every: int = 64):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(seed, template_hash: str, code_version: str, **options) -> str:
+        payload = json.dumps({
+            "seed": str(seed),
+            "templates": template_hash,
+            "code": code_version,
+            "options": options,
+        }, sort_keys=True, default=list)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + '.mid', base + '.json'
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """(midi_path, song_info) for a cached render, or None."""
+        midi_path, info_path = self._paths(key)
+        try:
+            with open(info_path, 'r') as f:
+                song_info = json.load(f)
+            os.utime(midi_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return midi_path, song_info
+
+    def put(self, key: str, midi_data: bytes, song_info: Dict) -> str:
+        """Store a render; the sidecar is written first so a visible .mid is always complete."""
+        midi_path, info_path = self._paths(key)
+        os.makedirs(os.path.dirname(midi_path), exist_ok=True)
+        _atomic_write(info_path, json.dumps(song_info).encode('utf-8'))
+        _atomic_write(midi_path, midi_data)
+
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.evict_every == 0
+        if due and (self.max_bytes is not None or self.max_age is not None):
+            self.evict()
+        return midi_path
+
+    @staticmethod
+    def export(midi_path: str, output_file: str) -> bool:
+        """
+        Place a cached file at output_file (hard link when possible, else copy).
+        Returns False when the entry was evicted since get() or put() returned it.
+        """
+        tmp_path = f"{output_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.link(midi_path, tmp_path)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                shutil.copyfile(midi_path, tmp_path)
+        except FileNotFoundError:
+            return False
+        os.replace(tmp_path, output_file)
+        return True
+
+    def evict(self) -> int:
+        """Drop entries older than max_age, then oldest entries until under max_bytes."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.mid'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+        for mtime, size, path in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            oversize = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or oversize):
+                continue
+            for p in (path, path[:-4] + '.json'):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
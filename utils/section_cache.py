@@ -0,0 +1,90 @@
+"""
+Section Cache
+LRU cache of generated sections, keyed by everything that determines
+their content: section type, progression, key, scale, mood, arrangement
+and the SeedStream path the lanes draw from.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from utils.rng import SeedStream
+
+
+class SectionCache:
+    """
+    Thread-safe LRU of (chord, melody, bass, drum) EventPart tuples.
+    Evicts least recently used sections once either the entry count or
+    the total number of cached note events exceeds its limit.
+    Cached parts are shared; callers copy them (EventPart.extend) rather
+    than mutating them.
+    """
+
+    def __init__(self, max_entries: int = 512, max_events: int = 200_000):
+        self.max_entries = max_entries
+        self.max_events = max_events
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._events = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(section_type, progression, root_key, scale_type, mood, is_last_section, rng,
+                 arrangement: tuple = ()) -> Optional[tuple]:
+        """
+        Cache key, or None when the RNG is not a SeedStream (output not reproducible).
+        `arrangement` is the section's per-bar lane masks.
+        """
+        if not isinstance(rng, SeedStream):
+            return None
+        return (section_type, tuple(progression), root_key, scale_type, mood,
+                bool(is_last_section), rng.root_seed, rng.path, tuple(arrangement))
+
+    def get(self, key) -> Optional[Tuple]:
+        with self._lock:
+            parts = self._entries.get(key)
+            if parts is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return parts
+
+    def record_hit(self) -> None:
+        """Count a reuse that was resolved outside the cache (e.g. a repeat within one song)."""
+        with self._lock:
+            self.hits += 1
+
+    def put(self, key, parts: Tuple) -> None:
+        size = sum(len(p) for p in parts)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._events -= sum(len(p) for p in old)
+            self._entries[key] = parts
+            self._events += size
+            while self._entries and (len(self._entries) > self.max_entries or self._events > self.max_events):
+                _, evicted = self._entries.popitem(last=False)
+                self._events -= sum(len(p) for p in evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._events = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "events": self._events,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,133 @@
+"""
+Song Plan
+Every high-level decision for a seed (key, scale, mood, tempo, structure
+and each section's progression) as a small serializable object. Plans
+are cheap to compute, so seeds can be searched by their plan before any
+time is spent rendering them; rendering a plan reproduces the seed exactly.
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.rng import SeedStream
+
+# Plan fields that can be filtered on
+CONSTRAINT_FIELDS = ("key", "scale", "mood", "bpm", "structure")
+
+
+class SongPlan:
+    """
+    Resolved song-level decisions. `sections` is a tuple of
+    (section_type, progression) pairs, or None for a header-only plan.
+    """
+
+    __slots__ = ('seed', 'key', 'scale', 'mood', 'bpm', 'structure', 'sections', 'repeat_sections')
+
+    def __init__(self, seed: str, key: str, scale: str, mood: str, bpm: int, structure: str,
+                 sections: Optional[Sequence[Tuple[str, Sequence[str]]]] = None, repeat_sections: Iterable[str] = ()):
+        self.seed = str(seed)
+        self.key = key
+        self.scale = scale
+        self.mood = mood
+        self.bpm = bpm
+        self.structure = structure
+        self.sections = None if sections is None else tuple((kind, tuple(prog)) for kind, prog in sections)
+        self.repeat_sections = tuple(sorted(repeat_sections))
+
+    def __repr__(self):
+        return (f"SongPlan(seed={self.seed!r}, key={self.key!r}, scale={self.scale!r}, mood={self.mood!r}, "
+                f"bpm={self.bpm}, structure={self.structure!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, SongPlan):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def song_info(self) -> Dict:
+        return {
+            "seed": self.seed,
+            "key": self.key,
+            "scale": self.scale,
+            "mood": self.mood,
+            "bpm": self.bpm,
+            "structure": self.structure,
+        }
+
+    def section_streams(self) -> List[SeedStream]:
+        """The RNG stream each section's lanes draw from (shared by repeated section types)."""
+        streams = []
+        for index, (kind, _) in enumerate(self.sections or ()):
+            if kind in self.repeat_sections:
+                streams.append(SeedStream(self.seed, "section", kind))
+            else:
+                streams.append(SeedStream(self.seed, "section", index, kind))
+        return streams
+
+    def to_dict(self) -> Dict:
+        data = self.song_info()
+        if self.sections is not None:
+            data["sections"] = [[kind, list(prog)] for kind, prog in self.sections]
+        if self.repeat_sections:
+            data["repeat_sections"] = list(self.repeat_sections)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SongPlan':
+        return cls(data["seed"], data["key"], data["scale"], data["mood"], data["bpm"], data["structure"],
+                   data.get("sections"), data.get("repeat_sections", ()))
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, line: str) -> 'SongPlan':
+        return cls.from_dict(json.loads(line))
+
+    def matches(self, constraints: Dict) -> bool:
+        """True when the plan satisfies every constraint from parse_constraints()."""
+        for field, allowed in constraints.items():
+            value = getattr(self, field)
+            if field == "bpm":
+                if not any(low <= value <= high for low, high in allowed):
+                    return False
+            elif value not in allowed:
+                return False
+        return True
+
+
+def parse_constraints(spec: str, choices: Optional[Dict[str, Iterable[str]]] = None) -> Dict:
+    """
+    Parse 'key=C,mood=energetic,bpm=120-130' into {field: allowed values}.
+    Repeating a field (or separating values with '|') allows any of them;
+    bpm values are inclusive ranges or single tempos. `choices` maps fields
+    to their known values; anything else raises ValueError instead of
+    silently matching nothing.
+    """
+    choices = choices or {}
+    constraints: Dict[str, list] = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        field, _, value = part.partition('=')
+        field = field.strip().lower()
+        if field not in CONSTRAINT_FIELDS or not value:
+            raise ValueError(f"Invalid constraint: {part} (fields: {', '.join(CONSTRAINT_FIELDS)})")
+        for option in value.split('|'):
+            option = option.strip()
+            if field == "bpm":
+                low, _, high = option.partition('-')
+                try:
+                    bounds = (int(low), int(high or low))
+                except ValueError:
+                    raise ValueError(f"Invalid bpm constraint: {option}") from None
+                if bounds[0] > bounds[1]:
+                    raise ValueError(f"Invalid bpm range: {option} (low must not exceed high)")
+                constraints.setdefault(field, []).append(bounds)
+                continue
+            option = option.capitalize() if field == "key" else option.lower()
+            known = choices.get(field)
+            if known is not None and option not in known:
+                raise ValueError(f"Unknown {field}: {option} (known: {', '.join(sorted(known))})")
+            constraints.setdefault(field, []).append(option)
+    return constraints
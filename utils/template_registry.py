@@ -0,0 +1,228 @@
+"""
+Template Registry
+Loads every JSON file under data/templates once per process, strips
+'# name' header lines, validates the schema and caches the parsed result.
+Files are reloaded only when their mtime changes.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.instrumentation import count, span
+from utils.music_theory import MusicTheory
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'templates')
+
+
+class TemplateError(ValueError):
+    """Raised when a template file cannot be parsed or fails validation"""
+
+
+def parse_template_text(text: str) -> Any:
+    """Parse template JSON, ignoring '#' comment/header lines."""
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith('#')]
+    body = "\n".join(lines).strip()
+    if not body:
+        raise TemplateError("template is empty")
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise TemplateError(f"invalid JSON: {e}") from e
+
+
+def _validate_progression_list(progressions, mode, where):
+    if not isinstance(progressions, list) or not progressions:
+        raise TemplateError(f"{where}: expected a non-empty list of progressions")
+    for prog in progressions:
+        if not isinstance(prog, list) or not prog or not all(isinstance(s, str) for s in prog):
+            raise TemplateError(f"{where}: each progression must be a non-empty list of strings")
+        for symbol in prog:
+            try:
+                MusicTheory.parse_roman_numeral(symbol, 'C', mode == 'minor')
+            except ValueError as e:
+                raise TemplateError(f"{where}: {e}") from e
+
+
+def validate_progressions(data):
+    """{'major': [[...]], 'minor': [[...]]} or {section: {'major': ..., 'minor': ...}}"""
+    if not isinstance(data, dict) or not data:
+        raise TemplateError("expected an object")
+    for name, value in data.items():
+        if name in ('major', 'minor'):
+            _validate_progression_list(value, name, name)
+        elif isinstance(value, dict):
+            for mode, progressions in value.items():
+                if mode not in ('major', 'minor'):
+                    raise TemplateError(f"{name}: unknown mode '{mode}'")
+                _validate_progression_list(progressions, mode, f"{name}.{mode}")
+        else:
+            raise TemplateError(f"unexpected entry '{name}'")
+
+
+def validate_atmosphere(data):
+    if not isinstance(data, dict) or "chill" not in data:
+        raise TemplateError("expected an object with at least a 'chill' mood")
+    for mood, config in data.items():
+        bpm_range = config.get("bpm_range") if isinstance(config, dict) else None
+        if (not isinstance(bpm_range, list) or len(bpm_range) != 2
+                or not all(isinstance(b, int) for b in bpm_range) or bpm_range[0] > bpm_range[1]):
+            raise TemplateError(f"{mood}: bpm_range must be [low, high]")
+
+
+def validate_structures(data):
+    if not isinstance(data, dict) or not data:
+        raise TemplateError("expected an object")
+    for name, flow in data.items():
+        if not isinstance(flow, list) or not flow or not all(isinstance(s, str) for s in flow):
+            raise TemplateError(f"{name}: expected a non-empty list of section names")
+
+
+def validate_instrument_config(data):
+    if not isinstance(data, dict):
+        raise TemplateError("expected an object")
+    for profile, sections in data.items():
+        if not isinstance(sections, dict):
+            raise TemplateError(f"{profile}: expected an object of sections")
+        for section, instruments in sections.items():
+            # Either one list for every bar, or a list of per-bar lists (cycled over the section)
+            bars = instruments if instruments and all(isinstance(b, list) for b in instruments) else [instruments]
+            for bar in bars:
+                if not isinstance(bar, list) or not all(isinstance(i, str) and i for i in bar):
+                    raise TemplateError(f"{profile}.{section}: expected a list of instrument names")
+
+
+DRUM_ROLES = ("beat", "fill", "final")
+DRUM_STEP_CHARS = set(".xXg")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_drum_patterns(data):
+    patterns = data.get("patterns") if isinstance(data, dict) else None
+    if not isinstance(patterns, dict) or not patterns:
+        raise TemplateError("expected an object with 'patterns'")
+    for name, pattern in patterns.items():
+        if not isinstance(pattern, dict) or pattern.get("role") not in DRUM_ROLES:
+            raise TemplateError(f"{name}: role must be one of {', '.join(DRUM_ROLES)}")
+        resolution = pattern.get("resolution")
+        if not isinstance(resolution, int) or resolution < 1:
+            raise TemplateError(f"{name}: resolution must be a positive number of steps per bar")
+        lanes = pattern.get("lanes")
+        if not isinstance(lanes, dict) or not lanes:
+            raise TemplateError(f"{name}: expected an object of lanes")
+        for lane, steps in lanes.items():
+            if not isinstance(steps, str) or len(steps) != resolution or not set(steps) <= DRUM_STEP_CHARS:
+                raise TemplateError(f"{name}.{lane}: expected {resolution} steps of '.', 'x', 'X' or 'g'")
+        moods = pattern.get("moods", [])
+        if not isinstance(moods, list) or not all(isinstance(m, str) for m in moods):
+            raise TemplateError(f"{name}: moods must be a list of mood names")
+        for field in ("weight", "note_length"):
+            if field in pattern and (not _is_number(pattern[field]) or pattern[field] <= 0):
+                raise TemplateError(f"{name}: {field} must be a positive number")
+        humanize = pattern.get("humanize", 0.0)
+        if not _is_number(humanize) or humanize < 0:
+            raise TemplateError(f"{name}: humanize must be a non-negative number")
+        swing = pattern.get("swing", 0.0)
+        if not _is_number(swing) or not 0 <= swing < 1:
+            raise TemplateError(f"{name}: swing must be a fraction of a step in [0, 1)")
+        if swing and not any(mark != '.' for steps in lanes.values() for mark in steps[1::2]):
+            raise TemplateError(f"{name}: swing only delays odd steps, but every hit is on an even step")
+    for lane, bounds in data.get("velocity", {}).items():
+        if not isinstance(bounds, list) or len(bounds) != 2 or not all(isinstance(v, int) for v in bounds):
+            raise TemplateError(f"velocity.{lane}: expected [low, high]")
+
+
+VALIDATORS = {
+    'atmosphere.json': validate_atmosphere,
+    'drum_patterns.json': validate_drum_patterns,
+    'structure_variation.json': validate_structures,
+    'instrument_config.json': validate_instrument_config,
+}
+
+
+class TemplateRegistry:
+    """Process-wide cache of parsed and validated templates"""
+
+    def __init__(self, template_dir: str = TEMPLATE_DIR, check_interval: float = 1.0):
+        self.template_dir = template_dir
+        self.check_interval = check_interval
+        self._entries: Dict[str, tuple] = {}  # name -> (mtime_ns, data or None)
+        self._last_check = 0.0
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load_all(self) -> None:
+        """Read every template in the directory (or reload the ones that changed)."""
+        with self._lock:
+            if os.path.isdir(self.template_dir):
+                for name in sorted(os.listdir(self.template_dir)):
+                    if name.endswith('.json'):
+                        self._refresh(name)
+            self._last_check = time.monotonic()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Parsed template by file name, or `default` if missing or invalid."""
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is None or now - self._last_check >= self.check_interval:
+            self.load_all()
+            entry = self._entries.get(name)
+        if entry is None or entry[1] is None:
+            return default
+        return entry[1]
+
+    def fingerprint(self) -> str:
+        """Hash of the parsed template set; changes only when template content changes."""
+        self.get('structure_variation.json')  # refresh if the check interval has passed
+        with self._lock:
+            if self._fingerprint is None:
+                content = {name: data for name, (_, data) in self._entries.items()}
+                payload = json.dumps(content, sort_keys=True).encode('utf-8')
+                self._fingerprint = hashlib.sha256(payload).hexdigest()
+            return self._fingerprint
+
+    def _refresh(self, name: str) -> None:
+        path = os.path.join(self.template_dir, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if self._entries.pop(name, None) is not None:
+                self._fingerprint = None
+            return
+
+        cached = self._entries.get(name)
+        if cached is not None and cached[0] == mtime:
+            return
+
+        try:
+            with span("template_load", template=name):
+                with open(path, 'r') as f:
+                    data = parse_template_text(f.read())
+                VALIDATORS.get(name, validate_progressions)(data)
+        except (OSError, TemplateError) as e:
+            print(f"Warning: template {name} ignored ({e})", file=sys.stderr)
+            count("template_errors", template=name)
+            data = None
+        self._entries[name] = (mtime, data)
+        self._fingerprint = None
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TemplateRegistry:
+    """Shared registry for data/templates, loaded on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry()
+            _registry.load_all()
+    return _registry
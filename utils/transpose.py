@@ -0,0 +1,64 @@
+"""
+Transposition
+Shifts generated event parts to another key. Each (lane, shift) pair is
+compiled once into a 128-entry pitch map that also folds notes back into
+the lane's playable range by octaves, so transposing a part is one table
+lookup per event. Drums are never transposed.
+"""
+
+from typing import Dict, Tuple
+
+from utils.events import EventPart, NoteEvent
+from utils.music_theory import MusicTheory
+
+# Playable MIDI range per lane; transposed notes outside it move by octaves
+LANE_RANGES = {
+    "chord": (36, 96),
+    "melody": (55, 91),
+    "bass": (28, 60),
+}
+
+UNPITCHED_LANES = {"drum"}
+
+_pitch_maps: Dict[Tuple[str, int], Tuple[int, ...]] = {}
+
+
+def key_offset(from_key: str, to_key: str) -> int:
+    """Smallest shift (-5..+6 semitones) from one key root to another."""
+    shift = (MusicTheory.pitch_class(to_key) - MusicTheory.pitch_class(from_key)) % 12
+    return shift - 12 if shift > 6 else shift
+
+
+def pitch_map(lane: str, semitones: int) -> Tuple[int, ...]:
+    """Transposed pitch for every MIDI pitch 0-127, clamped to the lane's range."""
+    key = (lane, semitones)
+    table = _pitch_maps.get(key)
+    if table is None:
+        low, high = LANE_RANGES.get(lane, (0, 127))
+        mapped = []
+        for pitch in range(128):
+            shifted = pitch + semitones
+            while shifted > high and shifted - 12 >= low:
+                shifted -= 12
+            while shifted < low and shifted + 12 <= high:
+                shifted += 12
+            mapped.append(min(127, max(0, shifted)))
+        table = _pitch_maps[key] = tuple(mapped)
+    return table
+
+
+def transpose_part(part: EventPart, semitones: int, lane: str) -> EventPart:
+    """A copy of `part` shifted by `semitones`; the original is left untouched."""
+    if semitones == 0 or lane in UNPITCHED_LANES:
+        return part
+    table = pitch_map(lane, semitones)
+    shifted = EventPart(part.channel)
+    shifted.events = [NoteEvent(ev.offset, ev.duration, table[ev.pitch], ev.velocity, ev.channel)
+                      for ev in part.events]
+    shifted.duration = part.duration
+    return shifted
+
+
+def transpose_parts(parts: Dict[str, EventPart], semitones: int) -> Dict[str, EventPart]:
+    """Transpose every lane of a song ({lane: EventPart})."""
+    return {lane: transpose_part(part, semitones, lane) for lane, part in parts.items()}
@@ -0,0 +1,139 @@
+"""
+Voice Leading
+Chooses chord voicings across a progression so consecutive chords move
+smoothly instead of jumping around the register. Candidate voicings are
+enumerated once per (root, chord type) and movement costs once per pair
+of chords; a progression is then a dynamic-programming pass over those
+cached tables.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from utils.music_theory import MusicTheory
+
+Voicing = Tuple[int, ...]
+
+
+def movement_cost(a: Voicing, b: Voicing) -> int:
+    """Total semitones the voices move from `a` to `b` (voices paired bottom to top)."""
+    if len(a) == len(b):
+        return sum(abs(x - y) for x, y in zip(a, b))
+    voices = max(len(a), len(b))
+    return sum(abs(a[i * len(a) // voices] - b[i * len(b) // voices]) for i in range(voices))
+
+
+class VoiceLeading:
+    """
+    Candidates keep every chord tone (7ths included) in close position and
+    drop-2, in every inversion and every octave that fits between LOW and
+    HIGH. Each candidate also has a static cost that prefers the root in
+    the bass and a register near CENTER.
+    """
+
+    LOW = 48
+    HIGH = 84
+    CENTER = 66
+    REGISTER_WEIGHT = 0.25
+    INVERSION_PENALTY = 3.0
+
+    _candidates: Dict[tuple, Tuple[Voicing, ...]] = {}
+    _static_costs: Dict[tuple, Tuple[float, ...]] = {}
+    _move_costs: Dict[tuple, Tuple[Tuple[int, ...], ...]] = {}
+    _paths: Dict[tuple, Tuple[Voicing, ...]] = {}
+
+    @classmethod
+    def _shapes(cls, pitch_classes: Sequence[int]) -> List[Voicing]:
+        """Close and drop-2 shapes of every inversion (octave placement comes later)."""
+        shapes = []
+        count = len(pitch_classes)
+        for inversion in range(count):
+            order = list(pitch_classes[inversion:]) + list(pitch_classes[:inversion])
+            close = [order[0]]
+            for pc in order[1:]:
+                note = close[-1] + (pc - close[-1]) % 12
+                close.append(note if note > close[-1] else note + 12)
+            shapes.append(tuple(close))
+            if count >= 3:
+                dropped = list(close)
+                dropped[-2] -= 12
+                shapes.append(tuple(sorted(dropped)))
+        return shapes
+
+    @classmethod
+    def candidates(cls, root: str, chord_type: str) -> Tuple[Voicing, ...]:
+        """Every voicing of the chord within [LOW, HIGH]."""
+        key = (root, chord_type)
+        found = cls._candidates.get(key)
+        if found is not None:
+            return found
+
+        root_pc = MusicTheory.pitch_class(root)
+        pitch_classes = MusicTheory.chord_set(root, chord_type).pitch_classes(root_pc)
+        voicings = set()
+        for shape in cls._shapes(pitch_classes):
+            base = shape[0] % 12 - shape[0]
+            for octave in range(11):
+                voicing = tuple(note + base + octave * 12 for note in shape)
+                if voicing[0] >= cls.LOW and voicing[-1] <= cls.HIGH:
+                    voicings.add(voicing)
+        if not voicings:
+            voicings.add(MusicTheory.get_chord(root, chord_type, octave=4))
+
+        found = cls._candidates[key] = tuple(sorted(voicings))
+        cls._static_costs[key] = tuple(
+            cls.REGISTER_WEIGHT * abs(sum(v) / len(v) - cls.CENTER)
+            + (0.0 if v[0] % 12 == root_pc else cls.INVERSION_PENALTY)
+            for v in found
+        )
+        return found
+
+    @classmethod
+    def _move_matrix(cls, previous: tuple, current: tuple) -> Tuple[Tuple[int, ...], ...]:
+        """Movement cost from each candidate of `previous` (rows) to each of `current` (columns)."""
+        key = (previous, current)
+        matrix = cls._move_costs.get(key)
+        if matrix is None:
+            sources = cls.candidates(*previous)
+            targets = cls.candidates(*current)
+            matrix = cls._move_costs[key] = tuple(
+                tuple(movement_cost(a, b) for b in targets) for a in sources
+            )
+        return matrix
+
+    @classmethod
+    def voice_progression(cls, chords: Sequence[Tuple[str, str]]) -> List[Voicing]:
+        """Smoothest voicing path through (root, chord_type) pairs: minimal total movement plus static costs."""
+        chords = tuple((root, chord_type) for root, chord_type in chords)
+        cached = cls._paths.get(chords)
+        if cached is not None:
+            return list(cached)
+        if not chords:
+            return []
+
+        cls.candidates(*chords[0])
+        scores = list(cls._static_costs[chords[0]])
+        back_pointers = []
+        for previous, current in zip(chords, chords[1:]):
+            matrix = cls._move_matrix(previous, current)
+            static = cls._static_costs[current]
+            new_scores = []
+            pointers = []
+            for j, own_cost in enumerate(static):
+                best_i = min(range(len(scores)), key=lambda i: scores[i] + matrix[i][j])
+                new_scores.append(scores[best_i] + matrix[best_i][j] + own_cost)
+                pointers.append(best_i)
+            scores = new_scores
+            back_pointers.append(pointers)
+
+        index = min(range(len(scores)), key=scores.__getitem__)
+        path = [index]
+        for pointers in reversed(back_pointers):
+            index = pointers[index]
+            path.append(index)
+        path.reverse()
+        voicings = cls._paths[chords] = tuple(cls.candidates(*chord)[i] for chord, i in zip(chords, path))
+        return list(voicings)
+
+    @classmethod
+    def voice_roman_progression(cls, progression: Sequence[str], key: str, is_minor: bool = False) -> List[Voicing]:
+        return cls.voice_progression([MusicTheory.parse_roman_numeral(symbol, key, is_minor) for symbol in progression])